@@ -0,0 +1,126 @@
+"""
+Checks and timings for merging an event editor page back into the store.
+
+    python -m bench.editor [n_events ...]
+
+Simulates what main.py does on "Update Views" for one page of a larger
+(optionally filtered) table: assign_event_ids, update_event_store and the
+incremental save_events. Rows are added with the labels st.data_editor may
+give them (the page's next position or an ID of an event on another page),
+one row is edited and one deleted. Every event that was not on the page
+must come back unchanged, in the store and in the saved database, and the
+added rows must get new IDs after the largest existing one. Then two
+sessions share one database: rows both add get different IDs from the
+database, and loading workbooks in one session keeps the other's events.
+"""
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+import data.db
+from bench.generate import make_event_table
+from data.db import load_events, reserve_event_ids, save_events
+from data.io import replace_saved_events
+from data.store import assign_event_ids, to_display, to_event_store, update_event_store
+
+PAGE_SIZE = 200
+
+
+def edit_page(store, page, added_label):
+    """
+    (edited_df, editor_state) for page with one edited row, one deleted row
+    and two added rows labelled added_label and added_label + 1.
+    """
+    editable = to_display(page)
+    edited = editable.drop(index=editable.index[1])
+    edited.loc[editable.index[0], "Title"] = "Edited title"
+    new_rows = editable.iloc[[2, 3]].copy()
+    new_rows["Title"] = "Added title"
+    new_rows.index = [added_label, added_label + 1]
+    edited = pd.concat([edited, new_rows])
+    state = {"edited_rows": {"0": {"Title": "Edited title"}}, "added_rows": [{}, {}], "deleted_rows": [1]}
+    return editable, edited, state
+
+
+def check_page(store, page, added_label, db_path):
+    editable, edited, state = edit_page(store, page, added_label)
+    t0 = time.perf_counter()
+    edited = assign_event_ids(edited, store, state)
+    new = update_event_store(store, edited, state, editable.index)
+    elapsed = time.perf_counter() - t0
+    untouched = store.index.difference(page.index)
+    pd.testing.assert_frame_equal(to_display(new.loc[untouched]), to_display(store.loc[untouched]))
+    added = new.index.difference(store.index)
+    assert list(added) == [store.index.max() + 1, store.index.max() + 2], added
+    assert (new.loc[added, "Title"] == "Added title").all()
+    assert new.loc[editable.index[0], "Title"] == "Edited title"
+    assert editable.index[1] not in new.index
+
+    save_events(to_display(store), path=db_path)
+    save_events(
+        to_display(new), changed=pd.Index([editable.index[0]]).union(added),
+        deleted=[editable.index[1]], path=db_path
+    )
+    saved = to_event_store(load_events(db_path))
+    pd.testing.assert_frame_equal(
+        to_display(saved.loc[untouched]), to_display(store.loc[untouched]), check_dtype=False
+    )
+    assert sorted(saved.index) == sorted(new.index)
+    return elapsed
+
+
+def check_sessions(store, db_path):
+    """
+    Sessions a and b start from the same saved table and both add rows, then
+    a loads a workbook in place of its table.
+    """
+    save_events(to_display(store), path=db_path)
+    saved = {}
+    for session in ("a", "b"):
+        page = store.iloc[:PAGE_SIZE]
+        editable, edited, state = edit_page(store, page, PAGE_SIZE)
+        edited = assign_event_ids(edited, store, state, reserve=lambda n: reserve_event_ids(n, path=db_path))
+        new = update_event_store(store, edited, state, editable.index)
+        added = new.index.difference(store.index)
+        save_events(to_display(new), changed=added, path=db_path)
+        saved[session] = new.loc[added]
+    assert saved["a"].index.intersection(saved["b"].index).empty, "sessions got the same event IDs"
+    on_disk = to_event_store(load_events(db_path))
+    for rows in saved.values():
+        pd.testing.assert_frame_equal(to_display(on_disk.loc[rows.index]), to_display(rows), check_dtype=False)
+
+    # Session a replaces the table it loaded; b's added rows stay
+    loaded = to_event_store(make_event_table(50, seed=1))
+    data.db.DB_FILE, default_db = db_path, data.db.DB_FILE
+    try:
+        replaced = replace_saved_events(loaded, store.index.union(saved["a"].index))
+    finally:
+        data.db.DB_FILE = default_db
+    on_disk = to_event_store(load_events(db_path))
+    assert sorted(on_disk.index) == sorted(saved["b"].index.union(replaced.index))
+    assert replaced.index.intersection(saved["b"].index).empty
+
+
+def run(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "events.db")
+        for n in sizes:
+            store = to_event_store(make_event_table(n, dirty=0.02))
+            first_page = store.iloc[:PAGE_SIZE]
+            # A filtered view: its rows are spread over the whole table
+            filtered = store[store["Category"] == "Reinigen"]
+            cases = [
+                ("page 1, next page position", first_page, PAGE_SIZE),
+                ("page 1, ID on page 2", first_page, PAGE_SIZE + 5),
+                ("filtered page", filtered.iloc[:PAGE_SIZE], int(filtered.index[0]) + 1),
+            ]
+            for name, page, label in cases:
+                elapsed = check_page(store, page, label, db_path)
+                print(f"{n:>7} events  {name:<28} other events unchanged  merge {elapsed * 1000:7.1f} ms")
+            check_sessions(store, db_path)
+            print(f"{n:>7} events  {'two sessions':<28} distinct IDs, other session's events kept")
+
+
+if __name__ == "__main__":
+    run([int(n) for n in sys.argv[1:]] or [1000, 50000])
@@ -0,0 +1,152 @@
+"""
+Synthetic shop-floor event tables for the benchmarks.
+
+    python -m bench.generate n_rows out.xlsx [overlap] [dirty]
+
+make_event_table builds a frame shaped like a filled-in event workbook:
+DD.MM dates, HH:MM times, free-text metric and Reserved cells, titles with
+a long-tailed (Pareto-like) frequency and optionally a share of dirty cells
+that the parsers have to reject or clean up.
+"""
+import io
+import sys
+import numpy as np
+import pandas as pd
+from data.store import EVENT_COLUMNS
+from parsing.dates import YEAR
+
+# Columns of an uploaded workbook (Source is added on ingest)
+WORKBOOK_COLUMNS = [col for col in EVENT_COLUMNS if col != "Source"]
+
+# Share of events per category
+DEFAULT_CATEGORY_MIX = {
+    "Anfahren": 0.12,
+    "Reinigen": 0.15,
+    "Process Breakdown": 0.15,
+    "Technical Break Down": 0.10,
+    "Problem": 0.15,
+    "Lösung": 0.10,
+    "Bemerkung": 0.10,
+    "Verbesserungsvorschlag": 0.05,
+    "Versuchsablauf": 0.08,
+}
+
+TITLE_WORDS = [
+    "Folienriss", "Düse verstopft", "Walzenwechsel", "Rezeptwechsel", "Messfehler",
+    "Randbeschnitt", "Kühlwasser", "Wickler", "Extruderdruck", "Kalibrierung",
+    "Materialwechsel", "Stromausfall", "Gelpartikel", "Dickenprofil", "Corona",
+]
+TEXT_WORDS = [
+    "Linie", "gestoppt", "Schicht", "Bediener", "informiert", "Folie", "Rolle",
+    "Qualität", "geprüft", "Instandhaltung", "Sensor", "getauscht", "Temperatur",
+    "erhöht", "Muster", "Labor", "Freigabe", "wartet", "Ersatzteil", "bestellt",
+]
+STATUS_VALUES = ["Offen", "In Arbeit", "Erledigt", ""]
+
+# Values written into dirty cells, per column group
+DIRTY_VALUES = {
+    "Date": ["", "31.02", "5.3.", "n/a", " 07.03 "],
+    "StartTime": ["", "25:61", "8.30", "ca. 10:00"],
+    "EndTime": ["", "24:00", "17-30", "?"],
+    "Scrap (m²)": ["", "n/a", "1,5", "-"],
+    "B-Grade (m²)": ["", "n/a", "2,0", "viel"],
+    "Cost (€)": ["", "n/a", "1.200,00", "€ 50"],
+    "Reserved": ["", "Ja", "?", " YES "],
+}
+
+
+def _text(rng, n, min_words, max_words, empty_share):
+    # Random word salads, "" for an empty_share of the rows
+    lengths = rng.integers(min_words, max_words + 1, n)
+    words = rng.choice(TEXT_WORDS, int(lengths.sum()))
+    texts = [" ".join(w) for w in np.split(words, np.cumsum(lengths)[:-1])]
+    return np.where(rng.random(n) < empty_share, "", np.array(texts, dtype=object))
+
+
+def _metric(rng, n, scale, empty_share, decimals=1):
+    values = np.round(rng.exponential(scale, n), decimals).astype(object)
+    values[rng.random(n) < empty_share] = ""
+    return values
+
+
+def make_event_table(n_rows, seed=0, days=365, overlap=1.0, category_mix=None, dirty=0.0, n_titles=60):
+    """
+    Event table with n_rows events spread over the first days days of YEAR,
+    in chronological order.
+
+    overlap is the mean number of events of one category running at the
+    same time (event durations scale with it), category_mix maps category
+    -> share (DEFAULT_CATEGORY_MIX), dirty is the share of Date, time,
+    metric and Reserved cells replaced by malformed values.
+    """
+    rng = np.random.default_rng(seed)
+    mix = category_mix or DEFAULT_CATEGORY_MIX
+    categories = list(mix)
+    shares = np.array([mix[c] for c in categories], dtype=float)
+    shares /= shares.sum()
+    category = rng.choice(len(categories), n_rows, p=shares)
+
+    day = rng.integers(0, days, n_rows)
+    start = rng.integers(0, 24 * 60 - 5, n_rows)
+    order = np.lexsort((start, day))
+    category, day, start = category[order], day[order], start[order]
+    # Mean gap between events of a category, times overlap, is the mean duration
+    per_day = np.maximum(shares[category] * n_rows / days, 1e-9)
+    duration = np.maximum(5, rng.exponential(overlap * 24 * 60 / per_day)).astype(int)
+    end = np.minimum(start + duration, 24 * 60 - 1)
+
+    dates = pd.Timestamp(YEAR, 1, 1) + pd.to_timedelta(day, unit="D")
+    # Zipf-like title frequencies: a few titles cause most of the events
+    title_words = np.array(
+        [f"{TITLE_WORDS[i % len(TITLE_WORDS)]} {i // len(TITLE_WORDS) + 1}" for i in range(n_titles)],
+        dtype=object
+    )
+    weights = 1 / np.arange(1, n_titles + 1)
+    titles = title_words[rng.choice(n_titles, n_rows, p=weights / weights.sum())]
+
+    df = pd.DataFrame({
+        "Date": dates.strftime("%d.%m"),
+        "StartTime": [f"{m // 60:02d}:{m % 60:02d}" for m in start],
+        "EndTime": [f"{m // 60:02d}:{m % 60:02d}" for m in end],
+        "Category": np.array(categories, dtype=object)[category],
+        "Title": titles,
+        "Description": _text(rng, n_rows, 3, 12, 0.1),
+        "Current Status": rng.choice(STATUS_VALUES, n_rows),
+        "Scrap (m²)": _metric(rng, n_rows, 20, 0.5),
+        "B-Grade (m²)": _metric(rng, n_rows, 10, 0.6),
+        "Reserved": rng.choice(["yes", "no", ""], n_rows, p=[0.2, 0.7, 0.1]),
+        "Cost (€)": _metric(rng, n_rows, 400, 0.5, decimals=0),
+        "Countermeasures": _text(rng, n_rows, 2, 8, 0.7),
+    }, columns=WORKBOOK_COLUMNS).astype(object)
+
+    if dirty > 0:
+        for col, values in DIRTY_VALUES.items():
+            hit = np.flatnonzero(rng.random(n_rows) < dirty)
+            df.iloc[hit, df.columns.get_loc(col)] = rng.choice(values, len(hit))
+        # Blank categories, as left by an unfinished row
+        hit = np.flatnonzero(rng.random(n_rows) < dirty)
+        df.iloc[hit, df.columns.get_loc("Category")] = None
+    return df
+
+
+def workbook_bytes(df):
+    """
+    df written to an in-memory .xlsx, as uploaded to the dashboard.
+    """
+    out = io.BytesIO()
+    df.to_excel(out, index=False, engine="openpyxl")
+    return out.getvalue()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    n_rows, path = int(sys.argv[1]), sys.argv[2]
+    overlap = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    dirty = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+    table = make_event_table(n_rows, overlap=overlap, dirty=dirty)
+    if path.endswith(".csv"):
+        table.to_csv(path, index=False)
+    else:
+        with open(path, "wb") as f:
+            f.write(workbook_bytes(table))
@@ -0,0 +1,130 @@
+"""
+Equivalence check and benchmark for the annotation collision index in
+plots.intervals.
+
+    python -m bench.intervals [n_events ...]
+
+Compares SwimlaneIntervals against the brute-force any() scans that
+plot_timeline used before, first query by query on random intervals
+(integer coordinates, so touching, identical and zero-width intervals are
+common), then on whole timelines of generated event tables: every figure
+is built once with each implementation and the swimlanes and annotation
+positions must match.
+"""
+import sys
+import time
+from datetime import date
+import numpy as np
+import pandas as pd
+import plots.timeline
+from bench.generate import make_event_table
+from data.store import to_event_store
+from plots.intervals import SwimlaneIntervals
+from utils.colors import CATEGORY_COLOR_MAP
+
+VIEW_MODES = ["Day", "Week", "Month"]
+
+
+class ScanIntervals:
+    """
+    Reference: the list of (x0, x1, lane) and the any() scans of the
+    original placement loop.
+    """
+
+    def __init__(self):
+        self.rects = []
+
+    def add(self, lane, x0, x1):
+        self.rects.append((x0, x1, lane))
+
+    def overlaps(self, lane, x0, x1):
+        return any(x0 < a1 and x1 > a0 and lane == alane for a0, a1, alane in self.rects)
+
+    def starts_within(self, lane, lo, hi):
+        # abs(center - a0) < width with lo/hi = center -/+ width
+        return any(lo < a0 < hi and lane == alane for a0, _, alane in self.rects)
+
+
+def check_queries(n_ops=20000, seed=0):
+    """
+    Random interleaved inserts and queries on a few lanes (one of them NaN).
+    """
+    rng = np.random.default_rng(seed)
+    lanes = ["A", "B", "C", np.nan]
+    index, scan = SwimlaneIntervals(), ScanIntervals()
+    for _ in range(n_ops):
+        lane = lanes[rng.integers(len(lanes))]
+        x0 = int(rng.integers(0, 200))
+        op = rng.random()
+        if op < 0.4:
+            # Zero-width points, touching and repeated intervals included
+            x1 = x0 + int(rng.integers(0, 6))
+            index.add(lane, x0, x1)
+            scan.add(lane, x0, x1)
+        elif op < 0.8:
+            x1 = x0 + int(rng.integers(1, 8))
+            assert index.overlaps(lane, x0, x1) == scan.overlaps(lane, x0, x1), ("overlaps", lane, x0, x1)
+        else:
+            x1 = x0 + int(rng.integers(0, 8))
+            assert index.starts_within(lane, x0, x1) == scan.starts_within(lane, x0, x1), ("starts_within", lane, x0, x1)
+
+
+def _placement(fig):
+    # Swimlane of every block and position/anchoring of every annotation
+    lanes = [tuple(trace.y) for trace in fig.data]
+    annotations = [
+        (a.x, a.y, a.ax, a.ay, a.xanchor, a.yanchor, a.showarrow) for a in fig.layout.annotations
+    ]
+    return lanes, annotations
+
+
+def make_table(n_events, seed=0):
+    """
+    Generated events over two weeks, plus exact duplicates and events that
+    start where another one ends (identical and touching intervals). Events
+    are short and dense, so every placement (inside, right, left, above,
+    below) occurs.
+    """
+    df = make_event_table(n_events, seed=seed, days=14, overlap=0.3)
+    rng = np.random.default_rng(seed)
+    duplicates = df.iloc[rng.integers(0, len(df), n_events // 20)]
+    touching = df.iloc[rng.integers(0, len(df), n_events // 20)].copy()
+    touching["StartTime"] = touching["EndTime"]
+    touching["EndTime"] = [f"{min(int(t[:2]) + 1, 23):02d}{t[2:]}" for t in touching["StartTime"]]
+    return to_event_store(pd.concat([df, duplicates, touching], ignore_index=True))
+
+
+def check_timelines(n_events, seed=0):
+    """
+    Figures built with SwimlaneIntervals and with ScanIntervals; returns the
+    total build time of each.
+    """
+    store = make_table(n_events, seed)
+    color_map = CATEGORY_COLOR_MAP.copy()
+    times = {}
+    placements = {}
+    for name, cls in [("index", SwimlaneIntervals), ("scan", ScanIntervals)]:
+        plots.timeline.SwimlaneIntervals = cls
+        try:
+            t0 = time.perf_counter()
+            placements[name] = [
+                _placement(plots.timeline.plot_timeline(store, view_mode, d, color_map, detail="full"))
+                for view_mode in VIEW_MODES for d in (date(2025, 1, 3), date(2025, 1, 10))
+            ]
+            times[name] = time.perf_counter() - t0
+        finally:
+            plots.timeline.SwimlaneIntervals = SwimlaneIntervals
+    assert placements["index"] == placements["scan"], "annotation placement differs from the any() scans"
+    return times
+
+
+def run(sizes):
+    check_queries()
+    print("queries: SwimlaneIntervals matches the any() scans")
+    for n in sizes:
+        times = check_timelines(n)
+        print(f"{n:>6} events  placement identical  index {times['index']:7.2f} s  scan {times['scan']:7.2f} s")
+
+
+if __name__ == "__main__":
+    run([int(n) for n in sys.argv[1:]] or [300, 1000])
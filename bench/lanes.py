@@ -0,0 +1,74 @@
+"""
+Benchmark for the swimlane allocator in plots.lanes.
+
+    python -m bench.lanes [n_events ...]
+
+Generates heavily overlapping events for a single category, checks that
+assign_overlap_lanes matches a plain first-fit lane scan and prints timings.
+The scan is quadratic in the number of open lanes, so the heap only pays off
+on large windows (Week/Month views with 10k+ events); at about 1k events
+both are equally fast.
+"""
+import sys
+import time
+import numpy as np
+from plots.lanes import assign_overlap_lanes
+
+DEFAULT_SIZES = [1000, 10000, 50000, 100000]
+# Speedup over the scan that counts as worth the heap allocator
+MIN_SPEEDUP = 2
+
+
+def make_events(n, seed=0, span_hours=24 * 7, max_minutes=240):
+    rng = np.random.default_rng(seed)
+    starts = np.sort(rng.integers(0, span_hours * 60, n))
+    ends = starts + rng.integers(5, max_minutes, n)
+    order = np.lexsort((ends, starts))
+    base = np.datetime64("2025-03-03T05:00", "ns")
+    return base + starts[order].astype("timedelta64[m]"), base + ends[order].astype("timedelta64[m]")
+
+
+def first_fit_scan(starts, ends):
+    """
+    Reference: linear scan over lane end times, as plot_timeline used to do.
+    """
+    lane_ends = []
+    lanes = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        for i, lane_end in enumerate(lane_ends):
+            if start >= lane_end:
+                lane_ends[i] = end
+                lanes.append(i)
+                break
+        else:
+            lane_ends.append(end)
+            lanes.append(len(lane_ends) - 1)
+    return np.array(lanes)
+
+
+def run(sizes):
+    justified = None
+    for n in sizes:
+        starts, ends = make_events(n)
+        t0 = time.perf_counter()
+        lanes = assign_overlap_lanes(starts, ends)
+        t_heap = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        expected = first_fit_scan(starts, ends)
+        t_scan = time.perf_counter() - t0
+        assert (lanes == expected).all(), "lane assignment differs from first-fit scan"
+        speedup = t_scan / t_heap
+        print(
+            f"{n:>7} events  {lanes.max() + 1:>4} lanes  heap {t_heap * 1000:8.1f} ms  "
+            f"scan {t_scan * 1000:8.1f} ms  speedup {speedup:5.1f}x"
+        )
+        if justified is None and speedup >= MIN_SPEEDUP:
+            justified = n
+    if justified is None:
+        print(f"heap allocator not {MIN_SPEEDUP}x faster than the scan at any size run")
+    else:
+        print(f"heap allocator {MIN_SPEEDUP}x+ faster than the scan from {justified} events on")
+
+
+if __name__ == "__main__":
+    run([int(n) for n in sys.argv[1:]] or DEFAULT_SIZES)
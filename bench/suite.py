@@ -0,0 +1,190 @@
+"""
+Dashboard benchmark suite on synthetic event tables (see bench.generate).
+
+    python -m bench.suite [--sizes 1000 10000 50000] [--repeat 3] [--out results.json] [--compare old.json]
+
+For every table size, times parse_datetimes, plot_timeline in each view
+mode, filter_by_view, daily_rollup, both dynamic Pareto builders and
+load_data (on an .xlsx of the table, up to --load-max-rows rows). Each
+benchmark is timed --repeat times and run once more under tracemalloc for
+its peak memory. Every call is cold: it gets a fresh copy of the event store
+(so the time index memo of plots.window misses) with the timeline layout
+template cache cleared, and the Pareto builders aggregate their own daily
+rollup, as after an edit of the table.
+Results are written as JSON; --compare prints them next to an earlier
+results file.
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import plotly
+from bench.generate import make_event_table, workbook_bytes
+from data.io import excel_engine, load_data
+from data.store import to_event_store
+from parsing.dates import YEAR, parse_datetimes
+from plots.pareto import filter_by_view, plot_dynamic_pareto_by_title, plot_dynamic_pareto_scrap_bgrade_by_title
+from plots.rollup import daily_rollup
+from plots.timeline import _layout_template, plot_timeline
+from utils.colors import CATEGORY_COLOR_MAP
+
+VIEW_MODES = ["Day", "Week", "Month"]
+DEFAULT_SIZES = [1000, 10000, 50000]
+# Writing and parsing .xlsx dominates above this size, so load_data is skipped
+DEFAULT_LOAD_MAX_ROWS = 20000
+
+
+def measure(fn, repeat, setup):
+    """
+    Wall times of repeat calls of fn(setup()) and the peak memory (MB) traced
+    during one more call. setup is not timed.
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - t0)
+    arg = setup()
+    tracemalloc.start()
+    try:
+        fn(arg)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak / 2 ** 20
+
+
+def benchmarks(n_rows, args):
+    """
+    (name, params, setup, fn) of every benchmark for an n_rows table; see
+    measure. The plots get the typed event store, as in the dashboard.
+    """
+    df = make_event_table(n_rows, seed=args.seed, days=args.days, overlap=args.overlap, dirty=args.dirty)
+    store = to_event_store(df)
+    # Middle of the generated period, so every window holds events
+    selected_date = date(YEAR, 1, 1) + timedelta(days=args.days // 2)
+    color_map = CATEGORY_COLOR_MAP.copy()
+
+    def cold_store():
+        # A new frame object has no memoized time index
+        _layout_template.cache_clear()
+        return store.copy()
+
+    yield "parse_datetimes", {}, lambda: df, parse_datetimes
+    yield "daily_rollup", {}, cold_store, daily_rollup
+    for view_mode in VIEW_MODES:
+        params = {"view_mode": view_mode}
+        yield "plot_timeline", params, cold_store, lambda s, v=view_mode: plot_timeline(s, v, selected_date, color_map)
+        yield "filter_by_view", params, cold_store, lambda s, v=view_mode: filter_by_view(s, v, selected_date)
+        yield "plot_dynamic_pareto_by_title", params, cold_store, lambda s, v=view_mode: plot_dynamic_pareto_by_title(
+            s, "Cost (€)", v, selected_date, color_map
+        )
+        yield "plot_dynamic_pareto_scrap_bgrade_by_title", params, cold_store, lambda s, v=view_mode: plot_dynamic_pareto_scrap_bgrade_by_title(
+            s, v, selected_date, color_map
+        )
+    if n_rows <= args.load_max_rows:
+        workbook = workbook_bytes(df)
+        yield "load_data", {"engine": excel_engine()}, lambda: io.BytesIO(workbook), lambda f: load_data(f, source="bench")
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = []
+    for n_rows in args.sizes:
+        for name, params, setup, fn in benchmarks(n_rows, args):
+            times, peak_mb = measure(fn, args.repeat, setup)
+            results.append({
+                "name": name,
+                "rows": n_rows,
+                "params": params,
+                "best_s": min(times),
+                "median_s": statistics.median(times),
+                "times_s": times,
+                "peak_mb": peak_mb,
+            })
+            label = " ".join([name] + [str(v) for v in params.values()])
+            print(f"{n_rows:>7} rows  {label:<52} {statistics.median(times) * 1000:9.1f} ms  {peak_mb:8.1f} MB")
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "plotly": plotly.__version__,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "days": args.days,
+            "overlap": args.overlap,
+            "dirty": args.dirty,
+        },
+        "results": results,
+    }
+
+
+def _key(result):
+    return result["name"], result["rows"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(old, new):
+    """
+    Print median time and peak memory of new next to old for every benchmark
+    both runs have.
+    """
+    previous = {_key(r): r for r in old["results"]}
+    for result in new["results"]:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        label = " ".join([result["name"]] + [str(v) for v in result["params"].values()])
+        ratio = result["median_s"] / before["median_s"] if before["median_s"] else float("nan")
+        print(
+            f"{result['rows']:>7} rows  {label:<52} "
+            f"{before['median_s'] * 1000:9.1f} -> {result['median_s'] * 1000:9.1f} ms ({ratio:5.2f}x)  "
+            f"{before['peak_mb']:8.1f} -> {result['peak_mb']:8.1f} MB"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard on synthetic event tables.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="table sizes in rows")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--days", type=int, default=365, help="days the events are spread over")
+    parser.add_argument("--overlap", type=float, default=1.0, help="mean concurrent events per category")
+    parser.add_argument("--dirty", type=float, default=0.02, help="share of malformed cells")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load-max-rows", type=int, default=DEFAULT_LOAD_MAX_ROWS,
+                        help="largest table size load_data is benchmarked on")
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+import pandas as pd
+
+# Local SQLite database holding the event table between sessions. It is
+# shared by every session of the process: event IDs are handed out by the
+# database (reserve_event_ids) and sessions write only the events they
+# changed, so concurrent sessions do not overwrite each other's events.
+DB_FILE = os.environ.get("TIMELINE_DB", "events.db")
+
+# Event table column -> database column; the event ID is the store's index label
+DB_COLUMNS = {
+    "Date": "date",
+    "StartTime": "start_time",
+    "EndTime": "end_time",
+    "Category": "category",
+    "Title": "title",
+    "Description": "description",
+    "Current Status": "current_status",
+    "Scrap (m²)": "scrap_m2",
+    "B-Grade (m²)": "bgrade_m2",
+    "Reserved": "reserved",
+    "Cost (€)": "cost_eur",
+    "Countermeasures": "countermeasures",
+    "Source": "source",
+}
+REAL_COLUMNS = {"scrap_m2", "bgrade_m2", "cost_eur"}
+
+# Rows per executemany batch
+WRITE_BATCH_SIZE = 500
+
+
+def connect(path=None):
+    conn = sqlite3.connect(path or DB_FILE)
+    columns = ", ".join(
+        f"{name} {'REAL' if name in REAL_COLUMNS else 'TEXT'}" for name in DB_COLUMNS.values()
+    )
+    conn.execute(f"CREATE TABLE IF NOT EXISTS events (event_id INTEGER PRIMARY KEY, {columns})")
+    # Next event ID to hand out; IDs are never reused, even after deletes
+    conn.execute("CREATE TABLE IF NOT EXISTS event_ids (id INTEGER PRIMARY KEY CHECK (id = 0), next_id INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO event_ids (id, next_id) VALUES (0, 0)")
+    # Databases saved before a column existed get it added (empty)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+    for name in DB_COLUMNS.values():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE events ADD COLUMN {name} {'REAL' if name in REAL_COLUMNS else 'TEXT'}")
+    conn.commit()
+    return conn
+
+
+def _sql_value(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _rows(display_df):
+    """
+    (event_id, values...) tuples of an editor-format frame, in DB_COLUMNS order.
+    """
+    values = display_df[list(DB_COLUMNS)].astype(object).itertuples(index=True, name=None)
+    for row in values:
+        yield tuple(_sql_value(v) for v in row)
+
+
+def load_events(path=None):
+    """
+    Saved event table in editor format, indexed by event ID, or None if
+    nothing has been saved yet.
+    """
+    path = path or DB_FILE
+    if not os.path.exists(path):
+        return None
+    conn = connect(path)
+    try:
+        df = pd.read_sql_query(
+            f"SELECT event_id, {', '.join(DB_COLUMNS.values())} FROM events ORDER BY event_id", conn,
+            index_col="event_id"
+        )
+    finally:
+        conn.close()
+    df.index.name = None
+    return df.rename(columns={v: k for k, v in DB_COLUMNS.items()})
+
+
+def reserve_event_ids(n, path=None):
+    """
+    First of n consecutive event IDs that no session has been given before
+    and no saved event has. The reservation is one write transaction, so
+    concurrent sessions always get disjoint IDs.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            # The UPDATE takes the write lock, held until commit
+            conn.execute(
+                "UPDATE event_ids SET next_id = MAX(next_id, (SELECT COALESCE(MAX(event_id) + 1, 0) FROM events)) + ?",
+                (n,)
+            )
+            return conn.execute("SELECT next_id FROM event_ids").fetchone()[0] - n
+    finally:
+        conn.close()
+
+
+def save_events(display_df, changed=None, deleted=(), path=None):
+    """
+    Persist an editor-format frame indexed by event ID in one transaction.
+    With changed (event IDs), only those rows are upserted and the deleted IDs
+    removed; without it the saved table is replaced by display_df, including
+    events other sessions saved.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            if changed is None:
+                conn.execute("DELETE FROM events")
+                rows = display_df
+            else:
+                conn.executemany("DELETE FROM events WHERE event_id = ?", [(int(i),) for i in deleted])
+                rows = display_df.loc[display_df.index.intersection(changed)]
+            names = list(DB_COLUMNS.values())
+            sql = (
+                f"INSERT INTO events (event_id, {', '.join(names)}) VALUES ({', '.join('?' * (len(names) + 1))}) "
+                f"ON CONFLICT(event_id) DO UPDATE SET {', '.join(f'{n} = excluded.{n}' for n in names)}"
+            )
+            for start in range(0, len(rows), WRITE_BATCH_SIZE):
+                conn.executemany(sql, _rows(rows.iloc[start:start + WRITE_BATCH_SIZE]))
+    finally:
+        conn.close()
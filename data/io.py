@@ -1,46 +1,327 @@
 import pandas as pd
 import os
 import io
+import glob
+import hashlib
+import pickle
+import csv
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from data.store import CATEGORICAL_COLUMNS, EVENT_COLUMNS, RAW_TEXT_COLUMNS, TEXT_COLUMNS, to_event_store, to_display
+from data.db import load_events, reserve_event_ids, save_events
+from utils.profiling import lap, profiled
 
 DATA_FILE = "events_last_saved.xlsx"
 
+# Normalized event stores of previously loaded workbooks, keyed by a hash of the file bytes
+INGEST_CACHE_DIR = os.environ.get("TIMELINE_INGEST_CACHE", ".ingest_cache")
+INGEST_CACHE_MAX_FILES = 32
+# Bump when load_data/to_event_store change what a cached store looks like
+INGEST_CACHE_VERSION = 3
+
+# Excel readers in order of preference: (pandas engine, module it needs)
+EXCEL_ENGINES = [("calamine", "python_calamine"), ("openpyxl", "openpyxl")]
+
+@lru_cache(maxsize=None)
+def excel_engine():
+    """
+    Fastest installed pd.read_excel engine, openpyxl as the fallback.
+    """
+    for engine, module in EXCEL_ENGINES:
+        if importlib.util.find_spec(module) is not None:
+            return engine
+    return "openpyxl"
+
+@lru_cache(maxsize=None)
+def _parquet_available():
+    return any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
 def load_data_from_file(filepath):
-    return pd.read_excel(filepath)
+    return pd.read_excel(filepath, engine=excel_engine())
+
+def _file_bytes(source):
+    """
+    Content of an uploaded file (Streamlit UploadedFile or file-like) or a path.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    data = source.read()
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return data
+
+def ingest_cache_key(data, source=None):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"v{INGEST_CACHE_VERSION}|{source}|".encode())
+    h.update(data)
+    return h.hexdigest()
 
-def load_data(uploaded_file=None):
+def _read_cached_store(key):
+    """
+    Cached event store for key, or None. Unreadable entries count as a miss.
+    """
+    for path in glob.glob(os.path.join(INGEST_CACHE_DIR, key + ".*")):
+        try:
+            if path.endswith(".parquet") and _parquet_available():
+                return pd.read_parquet(path)
+            if path.endswith(".pkl"):
+                return pd.read_pickle(path)
+        except Exception:
+            continue
+    return None
+
+def _write_cached_store(key, store):
+    """
+    Store the normalized frame as Parquet when an engine is installed (pickle
+    otherwise, or when a column cannot be written to Parquet). Cache errors
+    never fail a load.
+    """
+    try:
+        os.makedirs(INGEST_CACHE_DIR, exist_ok=True)
+        base = os.path.join(INGEST_CACHE_DIR, key)
+        path = None
+        if _parquet_available():
+            try:
+                store.to_parquet(base + ".parquet.tmp")
+                path = base + ".parquet"
+            except Exception:
+                if os.path.exists(base + ".parquet.tmp"):
+                    os.remove(base + ".parquet.tmp")
+        if path is None:
+            store.to_pickle(base + ".pkl.tmp", compression=None, protocol=pickle.HIGHEST_PROTOCOL)
+            path = base + ".pkl"
+        os.replace(path + ".tmp", path)
+        _prune_ingest_cache()
+    except OSError:
+        pass
+
+def _prune_ingest_cache():
+    # Keep the most recently written INGEST_CACHE_MAX_FILES entries
+    paths = [p for p in glob.glob(os.path.join(INGEST_CACHE_DIR, "*")) if not p.endswith(".tmp")]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[INGEST_CACHE_MAX_FILES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@profiled()
+def load_data(uploaded_file=None, source=None):
     if uploaded_file is not None:
         df = load_data_from_file(uploaded_file)
     else:
-        df = pd.DataFrame(columns=[
-            "Date", "StartTime", "EndTime", "Category", "Title", "Description",
-            "Current Status", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"
-        ])
+        # Last saved event table, if any (see save_data)
+        df = load_events()
+    lap("read")
+    if df is None:
+        df = pd.DataFrame(columns=EVENT_COLUMNS)
     # Ensure columns exist
-    for col in ["Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"]:
+    for col in EVENT_COLUMNS:
         if col not in df.columns:
             df[col] = ""
+    # Events without a source are attributed to the workbook they came from
+    if source is not None:
+        missing = df["Source"].isna() | (df["Source"].astype(str).str.strip() == "")
+        df.loc[missing, "Source"] = source
     # Remove any legacy columns if present
     for col in ["Start", "End", "Time"]:
         if col in df.columns:
             df = df.drop(columns=[col])
     # Reorder columns to ensure correct order
-    ordered_cols = [
-        "Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status",
-        "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"
-    ]
-    # Only keep columns that exist in df
-    ordered_cols = [col for col in ordered_cols if col in df.columns]
-    df = df[ordered_cols]
+    df = df[EVENT_COLUMNS]
+    lap("columns")
     return df
 
-def save_data(df):
-    pass  # No longer used
+def _source_name(uploaded_file):
+    # Workbook name without extension, e.g. "Line2_CW14"
+    name = getattr(uploaded_file, "name", uploaded_file)
+    if not isinstance(name, (str, os.PathLike)):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+def _load_workbook_store(data, source):
+    """
+    Typed event store of one workbook's bytes, through the ingest cache.
+    Runs in worker processes for load_workbooks.
+    """
+    key = ingest_cache_key(data, source)
+    store = _read_cached_store(key)
+    if store is None:
+        store = to_event_store(load_data(io.BytesIO(data), source=source))
+        _write_cached_store(key, store)
+    return store
+
+def load_event_store(uploaded_file=None):
+    """
+    Event table as a typed event store (see data.store.to_event_store).
+    Workbooks seen before are read from the ingest cache without parsing Excel.
+    """
+    if uploaded_file is None:
+        return to_event_store(load_data())
+    return _load_workbook_store(_file_bytes(uploaded_file), _source_name(uploaded_file))
+
+def merge_event_stores(stores):
+    """
+    One event store from several: duplicate events (same values in every
+    event column except Source, e.g. from overlapping weekly exports) are
+    kept once, and events get new IDs 0..n-1 in load order.
+    """
+    stores = [s for s in stores if len(s)] or stores[:1]
+    if not stores:
+        return to_event_store(pd.DataFrame(columns=EVENT_COLUMNS))
+    merged = pd.concat(stores, ignore_index=True)
+    for col in CATEGORICAL_COLUMNS + RAW_TEXT_COLUMNS:
+        merged[col] = merged[col].astype("category")
+    merged = merged[~merged.duplicated(subset=[col for col in merged.columns if col != "Source"])]
+    return merged.reset_index(drop=True)
 
+def load_workbooks(uploaded_files, max_workers=None, progress=None):
+    """
+    Load several workbooks into one typed event store. Workbooks not in the
+    ingest cache are parsed concurrently in a process pool (each through
+    load_data), tagged with their workbook name as Source and merged with
+    merge_event_stores in upload order. progress(done, total) is called
+    as files finish.
+    """
+    files = [(_file_bytes(f), _source_name(f)) for f in uploaded_files]
+    total = len(files)
+    stores = [_read_cached_store(ingest_cache_key(data, source)) for data, source in files]
+    pending = [i for i, store in enumerate(stores) if store is None]
+    done = total - len(pending)
+    if progress and done:
+        progress(done, total)
+    workers = min(len(pending), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for i in pending:
+            stores[i] = _load_workbook_store(*files[i])
+            done += 1
+            if progress:
+                progress(done, total)
+        return merge_event_stores(stores)
+    # Fresh interpreters rather than forks of the (multi-threaded) app server
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(_load_workbook_store, *files[i]): i for i in pending}
+        for future in as_completed(futures):
+            stores[futures[future]] = future.result()
+            done += 1
+            if progress:
+                progress(done, total)
+    return merge_event_stores(stores)
+
+def save_data(store, changed=None, deleted=()):
+    """
+    Persist the event store to the local database (data.db), keyed by event ID.
+    With changed/deleted event IDs only those rows are written (one
+    transaction); without them the saved table is replaced, including the
+    events of every other session.
+    """
+    if changed is not None:
+        store = store.loc[store.index.intersection(changed)]
+    save_events(to_display(store), changed, deleted)
+
+def replace_saved_events(store, replaced):
+    """
+    Save store (e.g. freshly loaded workbooks) in place of the events
+    replaced (the session's previous table) and return it with new event IDs
+    from the database. Events other sessions saved in the meantime are kept.
+    """
+    first = reserve_event_ids(len(store))
+    store = store.set_axis(pd.RangeIndex(first, first + len(store)))
+    save_data(store, changed=store.index, deleted=replaced)
+    return store
+
+@lru_cache(maxsize=1)
 def get_blank_excel_bytes():
-    empty_df = pd.DataFrame(columns=[
-        "Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status",
-        "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"
-    ])
+    # Static template, built once per process
+    empty_df = pd.DataFrame(columns=EVENT_COLUMNS)
     buf = io.BytesIO()
     empty_df.to_excel(buf, index=False)
     return buf.getvalue()
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+# Rows converted to editor format at a time while exporting
+EXPORT_CHUNK_ROWS = 5000
+
+def export_formats():
+    """
+    Export formats usable in this environment (Parquet needs pyarrow or fastparquet).
+    """
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "Parquet" or _parquet_available()]
+
+def _export_chunks(store):
+    # Editor-format rows, EXPORT_CHUNK_ROWS at a time
+    for start in range(0, len(store), EXPORT_CHUNK_ROWS):
+        yield to_display(store.iloc[start:start + EXPORT_CHUNK_ROWS])[EVENT_COLUMNS]
+
+def _cell(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+def _export_excel(store, out):
+    """
+    Stream rows into an .xlsx without holding the workbook in memory:
+    xlsxwriter's constant_memory mode when installed, else openpyxl write-only.
+    """
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        import xlsxwriter
+        workbook = xlsxwriter.Workbook(out, {"constant_memory": True, "in_memory": False})
+        sheet = workbook.add_worksheet("Sheet1")
+        sheet.write_row(0, 0, EVENT_COLUMNS)
+        r = 1
+        for chunk in _export_chunks(store):
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.write_row(r, 0, [_cell(v) for v in row])
+                r += 1
+        workbook.close()
+        return
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(EVENT_COLUMNS)
+    for chunk in _export_chunks(store):
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([_cell(v) for v in row])
+    workbook.save(out)
+
+def _export_csv(store, out):
+    text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EVENT_COLUMNS)
+    for chunk in _export_chunks(store):
+        writer.writerows([["" if _cell(v) is None else v for v in row] for row in chunk.itertuples(index=False, name=None)])
+    text.flush()
+    text.detach()
+
+def _export_parquet(store, out):
+    # Written column-wise from the typed store; free-text columns as strings
+    # since Excel input can mix numbers and text in them
+    store.astype({col: "string" for col in CATEGORICAL_COLUMNS + TEXT_COLUMNS + RAW_TEXT_COLUMNS}).to_parquet(out)
+
+def export_event_table(store, fmt="Excel"):
+    """
+    The event store (or any subset of its rows) in the given export format,
+    as bytes for st.download_button. Excel and CSV rows are converted in
+    chunks of EXPORT_CHUNK_ROWS rows, so only the finished file is held in
+    memory, not an editor-format copy of the whole table.
+    """
+    out = io.BytesIO()
+    if fmt == "Excel":
+        _export_excel(store, out)
+    elif fmt == "CSV":
+        _export_csv(store, out)
+    elif fmt == "Parquet":
+        _export_parquet(store, out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return out.getvalue()
@@ -0,0 +1,136 @@
+import re
+from bisect import bisect_left, insort
+import numpy as np
+import pandas as pd
+
+# Free-text columns covered by the search index
+SEARCH_COLUMNS = ["Title", "Description", "Countermeasures"]
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Case-folded word tokens of a text ("Düse" and "DÜSE" both give "düse").
+    """
+    return _TOKEN.findall(str(text).casefold())
+
+
+def _row_texts(store):
+    # Search columns of every row joined into one string ("" for missing values)
+    parts = [store[col].astype(object).where(store[col].notna(), "").astype(str) for col in SEARCH_COLUMNS]
+    text = parts[0]
+    for part in parts[1:]:
+        text = text + " " + part
+    return text.str.casefold()
+
+
+class EventSearchIndex:
+    """
+    Inverted index token -> event IDs over Title, Description and
+    Countermeasures. Queries are ANDed terms; a term ending in "*" matches
+    every token starting with it.
+    """
+
+    def __init__(self, store=None):
+        self.postings = {}
+        self.tokens_of = {}
+        self.vocabulary = []
+        if store is not None:
+            self.add(store)
+
+    def __len__(self):
+        return len(self.tokens_of)
+
+    def add(self, store):
+        """
+        Index (or re-index) every row of store.
+        """
+        self.remove([label for label in store.index if label in self.tokens_of])
+        tokens = _row_texts(store).str.findall(_TOKEN.pattern).map(frozenset)
+        postings = self.postings
+        new_tokens = []
+        for label, row_tokens in zip(store.index, tokens):
+            for token in row_tokens:
+                posting = postings.get(token)
+                if posting is None:
+                    postings[token] = {label}
+                    new_tokens.append(token)
+                else:
+                    posting.add(label)
+        # A few new tokens (an edit) are inserted, many (a load) merged in one sort
+        if len(new_tokens) > 64:
+            self.vocabulary = sorted(self.vocabulary + new_tokens)
+        else:
+            for token in new_tokens:
+                insort(self.vocabulary, token)
+        self.tokens_of.update(zip(store.index, tokens))
+
+    def remove(self, labels):
+        for label in labels:
+            for token in self.tokens_of.pop(label, ()):
+                posting = self.postings[token]
+                posting.discard(label)
+                if not posting:
+                    del self.postings[token]
+                    del self.vocabulary[bisect_left(self.vocabulary, token)]
+
+    def update(self, store, changed, deleted=()):
+        """
+        Apply an edit: drop deleted event IDs and re-index the changed ones.
+        """
+        self.remove(deleted)
+        self.add(store.loc[store.index.intersection(changed)])
+
+    def _matches(self, term):
+        if not term.endswith("*"):
+            return self.postings.get(term, set())
+        prefix = term[:-1]
+        matched = set()
+        for i in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            token = self.vocabulary[i]
+            if not token.startswith(prefix):
+                break
+            matched |= self.postings[token]
+        return matched
+
+    def search(self, query):
+        """
+        Event IDs matching every term of query, or None for an empty query.
+        """
+        terms = []
+        for word in query.split():
+            tokens = tokenize(word)
+            if tokens and word.endswith("*"):
+                tokens[-1] += "*"
+            terms.extend(tokens)
+        if not terms:
+            return None
+        sets = sorted((self._matches(t) for t in terms), key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            if not result:
+                break
+            result &= s
+        return result
+
+
+def filter_mask(store, categories=None, reserved=None, ids=None):
+    """
+    Boolean row mask of store: Category in categories (via categorical
+    codes), Reserved equal to reserved (True/False) and, if given, event ID
+    in ids (a search result).
+    """
+    mask = np.ones(len(store), dtype=bool)
+    if categories:
+        cats = store["Category"]
+        if isinstance(cats.dtype, pd.CategoricalDtype):
+            codes = cats.cat.categories.get_indexer(list(categories))
+            mask &= np.isin(cats.cat.codes.to_numpy(), codes[codes >= 0])
+        else:
+            mask &= cats.isin(categories).to_numpy()
+    if reserved is not None:
+        mask &= store["Reserved"].eq(reserved).fillna(False).to_numpy(dtype=bool)
+    if ids is not None:
+        mask &= store.index.isin(list(ids))
+    return mask
@@ -0,0 +1,253 @@
+import pandas as pd
+from parsing.dates import parse_datetimes, parse_dates
+
+# Columns of the event table as shown in the editor and written to Excel
+# (Source: workbook an event was loaded from)
+EVENT_COLUMNS = [
+    "Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status",
+    "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures", "Source"
+]
+METRIC_COLUMNS = ["Scrap (m²)", "B-Grade (m²)", "Cost (€)"]
+CATEGORICAL_COLUMNS = ["Category", "Title", "Current Status", "Source"]
+TEXT_COLUMNS = ["Description", "Countermeasures"]
+
+# Editor columns parsed into typed store columns -> store column keeping the
+# original cell text wherever the typed value cannot reproduce it (bad dates,
+# times of rows with a bad date, "ca. 200", free-text Reserved, ...)
+RAW_COLUMNS = {col: f"{col} (raw)" for col in ["Date", "StartTime", "EndTime", "Reserved"] + METRIC_COLUMNS}
+RAW_TEXT_COLUMNS = list(RAW_COLUMNS.values())
+
+# Columns of the typed event store, in order
+STORE_COLUMNS = [
+    "Day", "Start_dt", "End_dt", "Duration (min)", "Category", "Title", "Description",
+    "Current Status", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures", "Source"
+] + RAW_TEXT_COLUMNS
+
+# Cell texts that count as empty
+_BLANK_TEXTS = {"", "nan", "None", "NaT", "<NA>"}
+
+
+def normalize_editor_columns(df):
+    """
+    Bring Date/StartTime/EndTime into the text form shown in the event editor
+    (DD.MM and HH:MM strings, "" for missing times).
+    """
+    df = df.copy()
+    if "Date" in df.columns:
+        df["Date"] = df["Date"].astype(str).str[:5]
+    for col in ["StartTime", "EndTime"]:
+        if pd.api.types.is_float_dtype(df[col]) or pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("object")
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%H:%M")
+        df[col] = df[col].astype(str).str[:5]
+        df.loc[df[col] == "nan", col] = ""
+    return df
+
+
+def metric_values(values):
+    """
+    Numeric view of a metric column as float64 (NaN for missing/invalid).
+    Accepts raw editor text as well as the store's metric columns.
+    """
+    return pd.to_numeric(values, errors="coerce")
+
+
+def parse_reserved(values):
+    """
+    Free-text Reserved column -> nullable boolean ("yes" True, "no" False, else NA).
+    """
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype("boolean")
+    text = values.astype(str).str.strip().str.lower()
+    reserved = pd.Series(pd.NA, index=values.index, dtype="boolean")
+    reserved[text == "yes"] = True
+    reserved[text == "no"] = False
+    return reserved
+
+
+def _raw_text(original, typed_text):
+    """
+    original as text where it is not blank and differs from typed_text (the
+    text the typed column renders to), as a categorical; NaN elsewhere.
+    """
+    text = original.astype(object).where(original.notna(), "").astype(str)
+    keep = ~text.str.strip().isin(_BLANK_TEXTS) & (text != typed_text)
+    return text.where(keep).astype("category")
+
+
+def _cell_text(value):
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def display_text(values):
+    """
+    Cell values as label text: "" for missing values, whole numbers without ".0".
+    """
+    return values.astype(object).map(_cell_text)
+
+
+def is_event_store(df):
+    return "Start_dt" in df.columns and "Date" not in df.columns
+
+
+def to_event_store(df):
+    """
+    Typed, compact event store from an editor/Excel-format frame: datetime64
+    Day/Start/End, categorical Category/Title/Current Status, nullable boolean
+    Reserved and float64 metrics. Cells the typed columns cannot represent are
+    kept as text in the RAW_COLUMNS. Keeps df's index.
+    """
+    for col in EVENT_COLUMNS:
+        if col not in df.columns:
+            df = df.assign(**{col: ""})
+    text = normalize_editor_columns(df[["Date", "StartTime", "EndTime"]])
+    start_dt, end_dt, duration = parse_datetimes(text, with_duration=True)
+    day = parse_dates(text["Date"])
+    store = pd.DataFrame({
+        "Day": day,
+        "Start_dt": start_dt,
+        "End_dt": end_dt,
+        "Duration (min)": duration.round().astype("Int32"),
+    }, index=df.index)
+    for col in CATEGORICAL_COLUMNS:
+        store[col] = df[col].astype("category")
+    for col in TEXT_COLUMNS:
+        store[col] = df[col].astype(object)
+    for col in METRIC_COLUMNS:
+        store[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        store[RAW_COLUMNS[col]] = _raw_text(df[col], "").where(store[col].isna())
+    store["Reserved"] = parse_reserved(df["Reserved"])
+    typed = _typed_texts(store)
+    for col in ["Date", "StartTime", "EndTime"]:
+        store[RAW_COLUMNS[col]] = _raw_text(text[col], typed[col])
+    reserved = df["Reserved"]
+    if pd.api.types.is_bool_dtype(reserved):
+        reserved = reserved.map({True: "yes", False: "no"})
+    store[RAW_COLUMNS["Reserved"]] = _raw_text(reserved, typed["Reserved"])
+    return store[STORE_COLUMNS]
+
+
+def empty_event_store():
+    return to_event_store(pd.DataFrame(columns=EVENT_COLUMNS))
+
+
+def to_display(store, keep_datetimes=False):
+    """
+    Editor/Excel-format frame (DD.MM dates, HH:MM times, "yes"/"no" Reserved,
+    plain object text) plus Duration (min), indexed like store.
+    With keep_datetimes the parsed Start_dt/End_dt columns are kept as well.
+    """
+    typed = _typed_texts(store)
+    df = typed[["Date", "StartTime", "EndTime"]].copy()
+    for col in EVENT_COLUMNS[3:]:
+        if col in METRIC_COLUMNS:
+            df[col] = store[col]
+        elif col == "Reserved":
+            df[col] = typed[col]
+        else:
+            df[col] = store[col].astype(object)
+    # Cells that did not parse are shown as they were entered
+    for col, raw_col in RAW_COLUMNS.items():
+        raw = store[raw_col]
+        if raw.notna().any():
+            df[col] = df[col].astype(object).where(raw.isna(), raw.astype(object))
+    df["Duration (min)"] = store["Duration (min)"].astype("Int64")
+    if keep_datetimes:
+        df["Start_dt"] = store["Start_dt"]
+        df["End_dt"] = store["End_dt"]
+    return df
+
+
+def _typed_texts(store):
+    # Editor text of the typed Date/StartTime/EndTime/Reserved columns
+    return pd.DataFrame({
+        "Date": store["Day"].dt.strftime("%d.%m").fillna(""),
+        "StartTime": store["Start_dt"].dt.strftime("%H:%M").fillna(""),
+        "EndTime": store["End_dt"].dt.strftime("%H:%M").fillna(""),
+        "Reserved": store["Reserved"].astype(object).map({True: "yes", False: "no"}).fillna(""),
+    }, index=store.index)
+
+
+def _assign_rows(store, rows):
+    """
+    Write rows (a store-format frame) into store at rows.index, growing
+    categorical dtypes as needed.
+    """
+    for col in CATEGORICAL_COLUMNS + RAW_TEXT_COLUMNS:
+        new = rows[col].cat.categories.difference(store[col].cat.categories)
+        if len(new):
+            store[col] = store[col].cat.add_categories(new)
+        rows[col] = rows[col].astype(store[col].dtype)
+    # Column by column from the arrays: a frame or Series value is aligned by
+    # label, which nullable (Int32) columns mishandle for non-range indexes
+    for col in STORE_COLUMNS:
+        store.loc[rows.index, col] = rows[col].array
+    return store
+
+
+def assign_event_ids(edited_df, store, editor_state, reserve=None):
+    """
+    edited_df with fresh event IDs (index labels) for the rows added in the
+    editor: the last len(added_rows) rows of st.data_editor's result. The
+    labels the editor gave them are ignored, since they can be IDs of events
+    that are not shown. Added rows get reserve(n) + 0, 1, ... (e.g.
+    data.db.reserve_event_ids, so sessions sharing a database never get the
+    same IDs), or store.index.max() + 1, + 2, ... without reserve.
+    """
+    n_added = len((editor_state or {}).get("added_rows", []))
+    if not n_added:
+        return edited_df
+    if reserve is not None:
+        first = int(reserve(n_added))
+    else:
+        first = int(store.index.max()) + 1 if len(store) else 0
+    edited_df = edited_df.copy()
+    edited_df.index = edited_df.index[:len(edited_df) - n_added].append(pd.RangeIndex(first, first + n_added))
+    return edited_df
+
+
+def touched_rows(editor_state, editor_index, edited_df):
+    """
+    Index labels of edited_df rows that st.data_editor reports as edited or added.
+    editor_index is the index of the frame that was handed to the editor.
+    """
+    labels = []
+    for pos in (editor_state or {}).get("edited_rows", {}):
+        pos = int(pos)
+        if pos < len(editor_index):
+            labels.append(editor_index[pos])
+    n_added = len((editor_state or {}).get("added_rows", []))
+    if n_added:
+        labels.extend(edited_df.index[-n_added:])
+    return pd.Index(labels).intersection(edited_df.index)
+
+
+def update_event_store(store, edited_df, editor_state, editor_index):
+    """
+    Merge an editor page back into store by event ID: rows of the page
+    (editor_index) missing from edited_df are deleted, rows touched in the
+    editor are converted and written, added rows (with IDs from
+    assign_event_ids) are appended. Rows that were not on the page (other
+    pages, hidden by filters) are kept as they are.
+    """
+    touched = touched_rows(editor_state, editor_index, edited_df)
+    # Added rows are the last len(added_rows) rows and must carry fresh IDs;
+    # writing them under an existing ID would overwrite an event not shown
+    n_added = len((editor_state or {}).get("added_rows", []))
+    added = edited_df.index[len(edited_df) - n_added:]
+    if len(added.intersection(store.index)):
+        raise ValueError("rows added in the editor need fresh event IDs (see assign_event_ids)")
+    deleted = pd.Index(editor_index).difference(edited_df.index).intersection(store.index)
+    store = store.drop(index=deleted)
+    if len(added):
+        store = store.reindex(store.index.append(added))
+    else:
+        store = store.copy()
+    if len(touched):
+        store = _assign_rows(store, to_event_store(edited_df.loc[touched]))
+    return store
@@ -1,65 +1,130 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.colors import CATEGORY_OPTIONS, CATEGORY_COLOR_MAP, assign_colors, get_color
-from data.io import load_data, save_data, get_blank_excel_bytes
-from parsing.dates import parse_datetimes
-from plots.timeline import plot_timeline, compute_timeline
-from plots.pareto import plot_dynamic_pareto_by_title, plot_dynamic_pareto_scrap_bgrade_by_title
-from utils.branding import add_logo_to_fig
-import io
+from utils.colors import CATEGORY_OPTIONS, CATEGORY_COLOR_MAP, assign_colors
+from data.io import load_event_store, load_workbooks, replace_saved_events, save_data, get_blank_excel_bytes, export_event_table, export_formats, EXPORT_FORMATS
+from data.db import reserve_event_ids
+from data.store import assign_event_ids, empty_event_store, to_display, touched_rows, update_event_store
+from plots.timeline import plot_timeline
+from plots.pareto import plot_dynamic_pareto_by_title, plot_dynamic_pareto_scrap_bgrade_by_title, PARETO_TOP_N, PARETO_TOP_SHARE
+from plots.cache import frame_digest
+from plots.prefetch import FigurePrefetcher
+from plots.rollup import daily_rollup, update_daily_rollup
+from plots.window import adjacent_periods, period_date, window_rows
+from data.search import EventSearchIndex, filter_mask
+from utils.profiling import ProfileRun, profiling_enabled, stage
+
+# Rows sent to the event editor at a time
+EDITOR_PAGE_SIZE = 200
+# Reruns shown in the diagnostics panel
+PROFILE_HISTORY = 10
 
 st.set_page_config(page_title="Timeline Dashboard", layout="wide")
 st.title("📅 Timeline Dashboard")
 
+# Stage timings of this rerun (see utils.profiling), collected while the
+# diagnostics toggle at the bottom of the sidebar is on (for this session only)
+rerun_profile = ProfileRun("rerun", enabled=st.session_state.get("profiling", profiling_enabled())).start()
+
+def event_table_digest():
+    # Content hash of the current event table, recomputed only when the table object changes
+    df = st.session_state["df"]
+    if st.session_state.get("digest_df") is not df:
+        st.session_state["digest_df"] = df
+        st.session_state["df_digest"] = frame_digest(df)
+    return st.session_state["df_digest"]
+
+def event_rollup():
+    # Daily Pareto rollup of the current event table, rebuilt only when the table object
+    # changes without going through the editor (editor updates maintain it incrementally)
+    df = st.session_state["df"]
+    if st.session_state.get("rollup_df") is not df:
+        st.session_state["rollup_df"] = df
+        st.session_state["rollup"] = daily_rollup(df)
+    return st.session_state["rollup"]
+
+def event_color_map():
+    # Category colors of the current event table; the same map for every
+    # figure built from it, so the figure cache keys of all views match
+    color_map = CATEGORY_COLOR_MAP.copy()
+    missing = [cat for cat in st.session_state["df"]["Category"].dropna().unique() if cat not in color_map]
+    if missing:
+        color_map.update(assign_colors(missing))
+    return color_map
+
+def timeline_options_for(show_title=True, show_minutes=True, show_scrap=True, show_costs=True, show_reserved=True,
+                         full_detail=False, renderer="Auto"):
+    # plot_timeline options of the "Update Views" form; the defaults are the
+    # form's, so the first timeline has the same cache key as a submission
+    return dict(
+        show_title=show_title,
+        show_minutes=show_minutes,
+        show_scrap=show_scrap,
+        show_costs=show_costs,
+        show_reserved=show_reserved,
+        detail="full" if full_detail else "auto",
+        renderer=renderer.lower(),
+    )
+
+def figure_prefetcher():
+    # Session figure cache (filled ahead of time for the adjacent periods), replaced
+    # together with its figures whenever the event table changes
+    digest = event_table_digest()
+    prefetcher = st.session_state.get("prefetcher")
+    if prefetcher is None or prefetcher.digest != digest:
+        if prefetcher is not None:
+            prefetcher.cancel()
+        prefetcher = st.session_state["prefetcher"] = FigurePrefetcher(digest)
+    return prefetcher
+
+def event_search_index():
+    # Full-text index of the current event table, maintained like the rollup
+    df = st.session_state["df"]
+    if st.session_state.get("search_df") is not df:
+        st.session_state["search_df"] = df
+        st.session_state["search_index"] = EventSearchIndex(df)
+    return st.session_state["search_index"]
+
 with st.sidebar:
     st.header("Data")
-    uploaded_file = st.file_uploader("Load Data (.xlsx)", type=["xlsx"])
+    uploaded_files = st.file_uploader("Load Data (.xlsx)", type=["xlsx"], accept_multiple_files=True)
     # Load file button
-    if st.button("Load File") and uploaded_file:
-        df = load_data(uploaded_file)
+    if st.button("Load File") and uploaded_files:
+        # The event table is kept as a typed store (see data.store); several
+        # workbooks are parsed in parallel and merged
+        load_progress = st.progress(0.0, text=f"Loading {len(uploaded_files)} file(s)…")
+        with stage("load_workbooks"):
+            df = load_workbooks(
+                uploaded_files,
+                progress=lambda done, total: load_progress.progress(done / total, text=f"Loaded {done} of {total} file(s)")
+            )
+        # The loaded files replace this session's event table in the shared
+        # database; events other sessions saved since are kept
+        df = replace_saved_events(df, st.session_state["df"].index if "df" in st.session_state else [])
         st.session_state["df"] = df
-        st.success("File loaded.")
-    # If no event table, start with blank
+        st.success(f"{len(uploaded_files)} file(s) loaded, {len(df)} events.")
+    # If no event table in this session, start from the saved one (blank if none)
     elif "df" not in st.session_state:
-        df = pd.DataFrame(columns=[
-            "Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status",
-            "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"
-        ])
+        with stage("load_event_store"):
+            df = load_event_store()
         st.session_state["df"] = df
     else:
         df = st.session_state["df"]
 
-    # Download current event table as Excel
-    if st.button("Download Current Event Table"):
-        if "df" in st.session_state:
-            buf = io.BytesIO()
-            st.session_state["df"].to_excel(buf, index=False)
-            st.download_button(
-                "Download Event Table as Excel",
-                data=buf.getvalue(),
-                file_name="timeline_eventtable.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-
     # Create new Excel file with prompt to save current table
     if st.button("Create New Excel File"):
         if not st.session_state["df"].empty:
             st.warning("You have unsaved data in the event table. Please download it before creating a new blank file.")
             if st.button("Download & Continue"):
-                buf = io.BytesIO()
-                st.session_state["df"].to_excel(buf, index=False)
                 st.download_button(
                     "Download Event Table as Excel",
-                    data=buf.getvalue(),
+                    data=export_event_table(st.session_state["df"], "Excel"),
                     file_name="timeline_eventtable.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
                 # Clear event table after download
-                st.session_state["df"] = pd.DataFrame(columns=[
-                    "Date", "StartTime", "EndTime", "Category", "Title", "Description", "Current Status",
-                    "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)", "Countermeasures"
-                ])
+                save_data(empty_event_store(), changed=[], deleted=st.session_state["df"].index)
+                st.session_state["df"] = empty_event_store()
                 st.info("Event table cleared. You can now download a blank Excel file.")
                 st.download_button(
                     "Download Blank Excel",
@@ -75,34 +140,28 @@ with st.sidebar:
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
 
+def filter_events(df, category_filter, reserved_filter, search_query=""):
+    # Keyword search through the inverted index, combined with category/Reserved masks
+    ids = event_search_index().search(search_query) if search_query.strip() else None
+    reserved = None if reserved_filter == "All" else reserved_filter == "Yes"
+    return df[filter_mask(df, category_filter, reserved, ids)]
+
+search_query = st.text_input(
+    "Search Events",
+    help="Words in Title, Description or Countermeasures; all words must match. End a word with * to match its prefix, e.g. Folien*"
+)
 category_filter = st.multiselect("Filter by Category", df["Category"].dropna().unique())
 reserved_filter = st.selectbox("Filter Reserved", ["All", "Yes", "No"])
-filtered_df = df.copy()
-if category_filter:
-    filtered_df = filtered_df[filtered_df["Category"].isin(category_filter)]
-if reserved_filter != "All":
-    filtered_df = filtered_df[
-        filtered_df["Reserved"].astype(str).str.strip().str.lower().isin(
-            ["yes"] if reserved_filter == "Yes" else ["no"]
-        )
-    ]
+filtered_df = filter_events(df, category_filter, reserved_filter, search_query)
+# Only one page of the (filtered) table is sent to the editor; edits are merged
+# back into the full table by event ID
+n_pages = max(1, -(-len(filtered_df) // EDITOR_PAGE_SIZE))
+page = int(st.number_input(f"Event Table Page (1-{n_pages}, {len(filtered_df)} events)", min_value=1, max_value=n_pages, value=1, step=1))
+page_df = filtered_df.iloc[(page - 1) * EDITOR_PAGE_SIZE:page * EDITOR_PAGE_SIZE]
 
 with st.form("timeline_form"):
     st.subheader("Event Table")
-    editable_df = filtered_df.copy()
-    if "Date" in editable_df.columns:
-        editable_df["Date"] = editable_df["Date"].astype(str).str[:5]
-    for col in ["StartTime", "EndTime"]:
-        if pd.api.types.is_float_dtype(editable_df[col]) or pd.api.types.is_integer_dtype(editable_df[col]):
-            editable_df[col] = editable_df[col].astype("object")
-        if pd.api.types.is_datetime64_any_dtype(editable_df[col]):
-            editable_df[col] = editable_df[col].dt.strftime("%H:%M")
-        editable_df[col] = editable_df[col].astype(str).str[:5]
-        editable_df.loc[editable_df[col] == "nan", col] = ""
-    start_dt, end_dt = parse_datetimes(editable_df)
-    duration = end_dt - start_dt
-    duration_minutes = duration.apply(lambda x: x.total_seconds() / 60 if pd.notnull(x) else None)
-    editable_df["Duration (min)"] = pd.to_numeric(duration_minutes, errors="coerce").round().astype("Int64")
+    editable_df = to_display(page_df)
     cols = editable_df.columns.tolist()
     for col in ["Date", "StartTime", "EndTime"]:
         if col in cols:
@@ -110,11 +169,13 @@ with st.form("timeline_form"):
     if "Duration (min)" in cols:
         cols.remove("Duration (min)")
     editable_df = editable_df[["Date", "StartTime", "EndTime", "Duration (min)"] + cols]
+    # Editor state is tied to the rows on the page, so it resets when the page or filters change
+    editor_key = f"data_editor_{hash(tuple(editable_df.index))}"
     edited_df = st.data_editor(
         editable_df,
         num_rows="dynamic",
         use_container_width=True,
-        key="data_editor",
+        key=editor_key,
         column_config={
             "Date": st.column_config.TextColumn(
                 "Date",
@@ -141,11 +202,6 @@ with st.form("timeline_form"):
     )
     if edited_df[["Date", "StartTime", "EndTime", "Category"]].isnull().any().any():
         st.warning("Some rows are missing required fields like Date, StartTime, EndTime, or Category.")
-    all_categories = edited_df["Category"].dropna().unique()
-    color_map = CATEGORY_COLOR_MAP.copy()
-    missing = [cat for cat in all_categories if cat not in color_map]
-    if missing:
-        color_map.update(assign_colors(missing))
     col1, col2, col3, col4, col5, col6, col7 = st.columns(7)
     with col1:
         view_mode = st.selectbox("Timeline View", ["Day", "Week", "Month"])
@@ -163,58 +219,153 @@ with st.form("timeline_form"):
     with col7:
         show_costs = st.toggle("Show Costs", value=True)
     show_reserved = st.toggle("Show Reserved", value=True)
+    full_detail = st.toggle(
+        "Full Detail",
+        value=False,
+        help="Week/Month views with many events are merged into per-shift/per-day blocks; enable to always draw every event"
+    )
+    renderer = st.selectbox(
+        "Renderer",
+        ["Auto", "SVG", "WebGL"],
+        help="WebGL draws large timelines faster; block details are then shown on hover. Auto switches to WebGL for very large views."
+    )
 
 if update_clicked:
-    start_dt, end_dt = parse_datetimes(edited_df)
-    duration = end_dt - start_dt
-    duration_minutes = duration.apply(lambda x: x.total_seconds() / 60 if pd.notnull(x) else None)
-    edited_df["Duration (min)"] = pd.to_numeric(duration_minutes, errors="coerce").round().astype("Int64")
-    st.session_state["df"] = edited_df.copy()
-    save_data(edited_df)
-    with st.spinner("Building timeline…"):
-        fig = plot_timeline(
+    # Only rows touched in the editor are converted back into the typed store,
+    # re-aggregated in the Pareto rollup, re-indexed for search and written to
+    # the saved event table
+    old_df = st.session_state["df"]
+    old_rollup = event_rollup()
+    search_index = event_search_index()
+    edited_df = assign_event_ids(edited_df, old_df, st.session_state.get(editor_key), reserve=reserve_event_ids)
+    changed = touched_rows(st.session_state.get(editor_key), editable_df.index, edited_df)
+    st.session_state["df"] = update_event_store(
+        old_df,
+        edited_df,
+        st.session_state.get(editor_key),
+        editable_df.index
+    )
+    st.session_state["rollup"] = update_daily_rollup(old_rollup, old_df, st.session_state["df"], changed)
+    st.session_state["rollup_df"] = st.session_state["df"]
+    changed = changed.union(st.session_state["df"].index.difference(old_df.index))
+    deleted = old_df.index.difference(st.session_state["df"].index)
+    search_index.update(st.session_state["df"], changed, deleted)
+    st.session_state["search_df"] = st.session_state["df"]
+    save_data(st.session_state["df"], changed=changed, deleted=deleted)
+    timeline_options = timeline_options_for(
+        show_title, show_minutes, show_scrap, show_costs, show_reserved, full_detail, renderer
+    )
+    with st.spinner("Building timeline…"), stage("build timeline"):
+        fig = figure_prefetcher().figure(
+            plot_timeline,
             st.session_state["df"],
             view_mode,
-            selected_date,
-            color_map,
-            show_title=show_title,
-            show_minutes=show_minutes,
-            show_scrap=show_scrap,
-            show_costs=show_costs,
-            show_reserved=show_reserved
+            period_date(view_mode, selected_date),
+            event_color_map(),
+            **timeline_options
         )
     st.session_state["timeline_fig"] = fig
+    st.session_state["timeline_view"] = (view_mode, selected_date, timeline_options)
     st.success("Timeline updated!")
 
-all_categories = st.session_state["df"]["Category"].dropna().unique()
-color_map = CATEGORY_COLOR_MAP.copy()
-missing = [cat for cat in all_categories if cat not in color_map]
-if missing:
-    color_map.update(assign_colors(missing))
+# Export of the full table, the filtered table or the rows in the current timeline window
+with st.sidebar:
+    st.header("Export")
+    export_format = st.selectbox("Export Format", export_formats())
+    export_scope = st.selectbox("Export Rows", ["Full Table", "Filtered Table", "Timeline Window"])
+    if st.button("Prepare Export"):
+        export_df = st.session_state["df"]
+        if export_scope == "Filtered Table":
+            export_df = filter_events(export_df, category_filter, reserved_filter, search_query)
+        elif export_scope == "Timeline Window":
+            export_df, _ = window_rows(export_df, view_mode, selected_date, table_order=True)
+        extension, mime = EXPORT_FORMATS[export_format]
+        st.download_button(
+            f"Download {export_format} ({len(export_df)} events)",
+            data=export_event_table(export_df, export_format),
+            file_name=f"timeline_eventtable.{extension}",
+            mime=mime
+        )
+
+color_map = event_color_map()
 
 st.header("Timeline")
 if "timeline_fig" in st.session_state:
-    st.plotly_chart(st.session_state["timeline_fig"], use_container_width=True)
+    with stage("render timeline"):
+        st.plotly_chart(st.session_state["timeline_fig"], use_container_width=True)
 else:
     today = datetime.now().date()
-    fig = plot_timeline(
-        st.session_state["df"],
-        "Day",
-        today,
-        color_map,
-        show_title=True,
-        show_minutes=True,
-        show_scrap=True,
-        show_costs=True,
-        show_reserved=True
-    )
+    timeline_options = timeline_options_for()
+    with stage("build timeline"):
+        fig = figure_prefetcher().figure(plot_timeline, st.session_state["df"], "Day", today, color_map, **timeline_options)
     st.session_state["timeline_fig"] = fig
-    st.plotly_chart(fig, use_container_width=True)
+    st.session_state["timeline_view"] = ("Day", today, timeline_options)
+    with stage("render timeline"):
+        st.plotly_chart(fig, use_container_width=True)
 
 # Pareto charts filtered by timeline view and dynamic title
+pareto_col1, pareto_col2 = st.columns(2)
+with pareto_col1:
+    pareto_mode = st.selectbox(
+        "Pareto Titles",
+        ["All", "Top N", "Cumulative Share"],
+        help="Top N / Cumulative Share: titles beyond the limit are collapsed into one \"Other\" bar"
+    )
+pareto_limits = {}
+with pareto_col2:
+    if pareto_mode == "Top N":
+        pareto_limits["top_n"] = int(st.number_input("Titles Shown", min_value=1, value=PARETO_TOP_N, step=1))
+    elif pareto_mode == "Cumulative Share":
+        pareto_limits["top_share"] = st.slider("Cumulative Share (%)", 50, 100, PARETO_TOP_SHARE, step=5) / 100
+
 st.header(f"Pareto by Cost (€) - {view_mode} {selected_date}")
-st.plotly_chart(plot_dynamic_pareto_by_title(st.session_state["df"], "Cost (€)", view_mode, selected_date, color_map), use_container_width=True)
+with stage("render pareto cost"):
+    st.plotly_chart(figure_prefetcher().figure(plot_dynamic_pareto_by_title, st.session_state["df"], "Cost (€)", view_mode, period_date(view_mode, selected_date), color_map, rollup=event_rollup(), **pareto_limits), use_container_width=True)
 
 st.header(f"Pareto by Scrap + B-Grade - {view_mode} {selected_date}")
-st.plotly_chart(plot_dynamic_pareto_scrap_bgrade_by_title(st.session_state["df"], view_mode, selected_date, color_map), use_container_width=True)
+with stage("render pareto scrap"):
+    st.plotly_chart(figure_prefetcher().figure(plot_dynamic_pareto_scrap_bgrade_by_title, st.session_state["df"], view_mode, period_date(view_mode, selected_date), color_map, rollup=event_rollup(), **pareto_limits), use_container_width=True)
+
+# With the current view on screen, build the previous and next period of the
+# timeline and both Paretos in the background, so stepping through days or
+# weeks is served from the session figure cache
+prefetcher = figure_prefetcher()
+if "timeline_view" in st.session_state:
+    timeline_view_mode, timeline_date, timeline_options = st.session_state["timeline_view"]
+    for period in adjacent_periods(timeline_view_mode, timeline_date):
+        prefetcher.prefetch(plot_timeline, st.session_state["df"], timeline_view_mode, period, color_map, **timeline_options)
+for period in adjacent_periods(view_mode, selected_date):
+    prefetcher.prefetch(plot_dynamic_pareto_by_title, st.session_state["df"], "Cost (€)", view_mode, period, color_map, rollup=event_rollup(), **pareto_limits)
+    prefetcher.prefetch(plot_dynamic_pareto_scrap_bgrade_by_title, st.session_state["df"], view_mode, period, color_map, rollup=event_rollup(), **pareto_limits)
+
+# Diagnostics: per-stage timings of the last reruns (also written to the log)
+rerun_profile.stop()
+if rerun_profile.stages:
+    st.session_state["profile_runs"] = (st.session_state.get("profile_runs", []) + [rerun_profile])[-PROFILE_HISTORY:]
 
+def profile_table(runs):
+    # Milliseconds per stage (rows) and rerun (columns, newest first)
+    rows = {}
+    columns = []
+    for run in reversed(runs):
+        column = run.started.strftime("%H:%M:%S.%f")[:-3]
+        columns.append(column)
+        rows.setdefault("rerun", {})[column] = run.seconds * 1000
+        for path, seconds in run.stages:
+            times = rows.setdefault(path, {})
+            times[column] = times.get(column, 0) + seconds * 1000
+    return pd.DataFrame.from_dict(rows, orient="index", columns=columns).round(1)
+
+with st.sidebar:
+    st.header("Diagnostics")
+    st.toggle(
+        "Profile Reruns",
+        value=profiling_enabled(),
+        key="profiling",
+        help="Time each stage of loading and chart building; takes effect from the next rerun"
+    )
+    if st.session_state.get("profile_runs"):
+        if st.button("Clear Diagnostics"):
+            st.session_state["profile_runs"] = []
+        else:
+            st.dataframe(profile_table(st.session_state["profile_runs"]), use_container_width=True)
@@ -1,25 +1,48 @@
 import pandas as pd
-from datetime import datetime
+from utils.profiling import profiled
 
-def parse_datetimes(df):
+YEAR = 2025
+
+# "DD.MM" with optional surrounding whitespace, mirroring int() on each split part
+_DATE_PATTERN = r"^\s*([+-]?[0-9]+)\s*\.\s*([+-]?[0-9]+)\s*$"
+
+
+def parse_dates(dates):
+    """
+    Vectorized DD.MM -> datetime64 (midnight), NaT on bad input.
+    """
+    parts = dates.astype(str).str.extract(_DATE_PATTERN)
+    day = pd.to_numeric(parts[0], errors="coerce")
+    month = pd.to_numeric(parts[1], errors="coerce")
+    ymd = pd.DataFrame({"year": YEAR, "month": month, "day": day}, index=dates.index)
+    return pd.to_datetime(ymd, errors="coerce").astype("datetime64[ns]")
+
+
+def _parse_times(times):
+    """
+    Vectorized HH:MM -> offset from midnight as timedelta64, NaT on bad input.
+    """
+    parsed = pd.to_datetime(times.astype(str), format="%H:%M", errors="coerce")
+    return parsed - parsed.dt.normalize()
+
+
+@profiled()
+def parse_datetimes(df, with_duration=False):
     """
     Combine Date (DD.MM) with StartTime/EndTime (HH:MM), year is always 2025.
-    Returns (start_dt, end_dt) as pd.Series.
-    """
-    def combine(row, col):
-        try:
-            date_str = str(row["Date"])
-            if "." in date_str:
-                day, month = date_str.split(".")
-                date_part = datetime(year=2025, month=int(month), day=int(day))
-            else:
-                return pd.NaT
-            time_part = pd.to_datetime(str(row[col]), format="%H:%M", errors="coerce").time()
-            if pd.isnull(time_part):
-                return pd.NaT
-            return datetime.combine(date_part.date(), time_part)
-        except Exception:
-            return pd.NaT
-    start_dt = df.apply(lambda row: combine(row, "StartTime"), axis=1)
-    end_dt = df.apply(lambda row: combine(row, "EndTime"), axis=1)
+    Returns (start_dt, end_dt) as pd.Series, or (start_dt, end_dt, duration_min)
+    when with_duration is set (duration in minutes as float, NaN if unknown).
+    """
+    dates = parse_dates(df["Date"])
+    start_dt = (dates + _parse_times(df["StartTime"])).astype("datetime64[ns]")
+    end_dt = (dates + _parse_times(df["EndTime"])).astype("datetime64[ns]")
+    if with_duration:
+        return (start_dt, end_dt, duration_minutes(start_dt, end_dt))
     return (start_dt, end_dt)
+
+
+def duration_minutes(start_dt, end_dt):
+    """
+    Duration between two datetime Series in minutes (float, NaN if either is NaT).
+    """
+    return (end_dt - start_dt).dt.total_seconds() / 60
@@ -0,0 +1,98 @@
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+import pandas as pd
+
+# Keyword arguments that are derived from the frame itself and therefore not part of the key
+_UNKEYED_KWARGS = {"rollup"}
+
+
+def frame_digest(df):
+    """
+    Stable content hash of a frame: column names, dtypes, index and values.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _freeze(value):
+    """
+    Hashable form of nested dicts/lists/tuples/sets.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return tuple(sorted(_freeze(v) for v in value))
+    return value
+
+
+class FigureCache:
+    """
+    Bounded LRU cache of built figures with hit/miss counters.
+    Cached figures are shared; callers must treat them as read-only.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is None:
+                self.misses += 1
+                return None
+            self._figures.move_to_end(key)
+            self.hits += 1
+            return fig
+
+    def put(self, key, fig):
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+
+    def __contains__(self, key):
+        # Membership test that does not count as a hit or miss
+        with self._lock:
+            return key in self._figures
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._figures), "maxsize": self.maxsize}
+
+
+def figure_key(build, digest, args, kwargs):
+    """
+    Cache key of build(df, *args, **kwargs) for a frame with content hash digest.
+    """
+    return (
+        build.__module__, build.__name__, digest, _freeze(args),
+        _freeze({k: v for k, v in kwargs.items() if k not in _UNKEYED_KWARGS}),
+    )
+
+
+def cached_figure(build, df, *args, digest, cache, **kwargs):
+    """
+    build(df, *args, **kwargs), or the figure cached for the same arguments
+    and a frame with content hash digest (see frame_digest).
+    """
+    key = figure_key(build, digest, args, kwargs)
+    fig = cache.get(key)
+    if fig is None:
+        fig = build(df, *args, **kwargs)
+        cache.put(key, fig)
+    return fig
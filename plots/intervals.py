@@ -0,0 +1,80 @@
+from bisect import bisect_left, bisect_right, insort
+import pandas as pd
+
+
+class _Lane:
+    """
+    Intervals of one swimlane: merged positive-width segments, zero-width
+    points and the raw start of every interval that was added.
+    """
+    __slots__ = ("seg_starts", "seg_ends", "points", "starts")
+
+    def __init__(self):
+        self.seg_starts = []
+        self.seg_ends = []
+        self.points = []
+        self.starts = []
+
+
+class SwimlaneIntervals:
+    """
+    Per-swimlane interval index used for annotation collision checks.
+    Supports insert and the two queries the placement loop needs in
+    O(log n) per lane. Intervals in a missing (NaN) lane never collide,
+    matching `lane == other_lane` comparisons.
+    """
+
+    def __init__(self):
+        self._lanes = {}
+
+    def _lane(self, lane):
+        if pd.isna(lane):
+            return None
+        return self._lanes.get(lane)
+
+    def add(self, lane, x0, x1):
+        """
+        Insert interval [x0, x1] (x0 <= x1) into lane.
+        """
+        if pd.isna(lane):
+            return
+        entry = self._lanes.get(lane)
+        if entry is None:
+            entry = self._lanes[lane] = _Lane()
+        insort(entry.starts, x0)
+        if not x0 < x1:
+            insort(entry.points, x0)
+            return
+        # Merge with every segment it overlaps or touches; for positive-width
+        # queries the union answers overlap tests exactly like the pieces
+        lo = bisect_left(entry.seg_ends, x0)
+        hi = bisect_right(entry.seg_starts, x1)
+        if lo < hi:
+            x0 = min(x0, entry.seg_starts[lo])
+            x1 = max(x1, entry.seg_ends[hi - 1])
+        entry.seg_starts[lo:hi] = [x0]
+        entry.seg_ends[lo:hi] = [x1]
+
+    def overlaps(self, lane, x0, x1):
+        """
+        True if any interval [a0, a1] in lane satisfies x0 < a1 and x1 > a0.
+        Query intervals must have positive width (x0 < x1).
+        """
+        entry = self._lane(lane)
+        if entry is None:
+            return False
+        i = bisect_left(entry.seg_starts, x1) - 1
+        if i >= 0 and entry.seg_ends[i] > x0:
+            return True
+        j = bisect_right(entry.points, x0)
+        return j < len(entry.points) and entry.points[j] < x1
+
+    def starts_within(self, lane, lo, hi):
+        """
+        True if any interval in lane starts strictly between lo and hi.
+        """
+        entry = self._lane(lane)
+        if entry is None:
+            return False
+        j = bisect_right(entry.starts, lo)
+        return j < len(entry.starts) and entry.starts[j] < hi
@@ -0,0 +1,79 @@
+import heapq
+import numpy as np
+import pandas as pd
+
+
+def _as_int64(values):
+    """
+    Datetime-like or numeric array -> int64 numpy array (ns for datetimes).
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64)
+    return values.astype(np.int64)
+
+
+def assign_overlap_lanes(starts, ends):
+    """
+    Interval partitioning for intervals sorted by start.
+    Each interval goes to the lowest-numbered lane whose last interval has ended
+    (end <= start), otherwise a new lane is opened. Returns an int array of lanes.
+    """
+    starts = _as_int64(starts).tolist()
+    ends = _as_int64(ends).tolist()
+    lanes = np.zeros(len(starts), dtype=np.int64)
+    busy = []  # (end, lane) of lanes still occupied
+    free = []  # lanes that are free at the current start
+    n_lanes = 0
+    for i, start in enumerate(starts):
+        # Starts are non-decreasing, so a lane freed here stays free for later intervals
+        while busy and busy[0][0] <= start:
+            heapq.heappush(free, heapq.heappop(busy)[1])
+        if free:
+            lane = heapq.heappop(free)
+        else:
+            lane = n_lanes
+            n_lanes += 1
+        lanes[i] = lane
+        heapq.heappush(busy, (ends[i], lane))
+    return lanes
+
+
+def _category_runs(categories):
+    """
+    (start, stop) slices of consecutive equal categories, skipping missing ones.
+    """
+    codes, _ = pd.factorize(pd.Series(categories))
+    if len(codes) == 0:
+        return []
+    bounds = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate([[0], bounds])
+    stops = np.concatenate([bounds, [len(codes)]])
+    return [(a, b) for a, b in zip(starts, stops) if codes[a] != -1]
+
+
+def assign_sublanes(categories, starts, ends):
+    """
+    SubLane per event for rows sorted by (Category, Start, End): overlapping
+    events of the same category are spread over numbered lanes.
+    """
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    sublanes = np.zeros(len(starts), dtype=np.int64)
+    for a, b in _category_runs(categories):
+        sublanes[a:b] = assign_overlap_lanes(starts[a:b], ends[a:b])
+    return sublanes
+
+
+def assign_day_lanes(categories, starts):
+    """
+    Month-view SubLane per event for rows sorted by (Category, Start, End).
+    Filling lanes first-fit with "at most one event per day" puts the k-th
+    event of a category on a given day into lane k, so this is the running
+    count of events per (category, start day). Missing categories stay in lane 0.
+    """
+    categories = pd.Series(categories).reset_index(drop=True)
+    days = pd.Series(starts).reset_index(drop=True).dt.floor("D")
+    rank = days.groupby([categories, days], dropna=False, sort=False).cumcount()
+    rank[categories.isna()] = 0
+    return rank.to_numpy(dtype=np.int64)
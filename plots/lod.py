@@ -0,0 +1,71 @@
+import pandas as pd
+from data.store import metric_values
+
+# Above this many events in the visible window, Week/Month timelines are aggregated
+LOD_EVENT_THRESHOLD = 400
+
+# Aggregation bucket per view mode: shifts in Week view, production days in Month view
+LOD_BUCKETS = {
+    "Week": pd.Timedelta(hours=8),
+    "Month": pd.Timedelta(days=1),
+}
+LOD_BUCKET_NAMES = {"Week": "shift", "Month": "day"}
+
+
+def use_lod(view_mode, n_events, detail="auto", threshold=None):
+    """
+    Decide whether a timeline should be drawn as aggregate blocks.
+    detail: "auto" (aggregate above the threshold), "full" (never) or "aggregate" (always).
+    Day view is always drawn in full detail.
+    """
+    if detail == "full" or view_mode not in LOD_BUCKETS:
+        return False
+    if detail == "aggregate":
+        return True
+    if threshold is None:
+        threshold = LOD_EVENT_THRESHOLD
+    return n_events > threshold
+
+
+def aggregate_events(df, view_mode, window_start):
+    """
+    Merge events per category into one block per shift (Week) or production
+    day (Month), counted from window_start. Blocks span the earliest start to
+    the latest end of their events and carry summed duration, scrap, B-Grade
+    and cost. Returns a frame with the columns plot_timeline expects.
+    """
+    work = pd.DataFrame({
+        "Category": df["Category"],
+        "Bucket": (df["Start_dt"] - window_start) // LOD_BUCKETS[view_mode],
+        "Start_dt": df["Start_dt"],
+        "End_dt": df["End_dt"],
+        "Minutes": (df["End_dt"] - df["Start_dt"]).dt.total_seconds() / 60,
+        "Scrap": metric_values(df["Scrap (m²)"]).fillna(0),
+        "BGrade": metric_values(df["B-Grade (m²)"]).fillna(0),
+        "Cost": metric_values(df["Cost (€)"]).fillna(0),
+        "Reserved": df["Reserved"].astype(str).str.strip().str.lower().eq("yes"),
+        "Title": df["Title"].astype(str),
+    }, index=df.index)
+    agg = work.groupby(["Category", "Bucket"], sort=False, dropna=False).agg(
+        Start_dt=("Start_dt", "min"),
+        End_dt=("End_dt", "max"),
+        Events=("Start_dt", "size"),
+        Minutes=("Minutes", "sum"),
+        Scrap=("Scrap", "sum"),
+        BGrade=("BGrade", "sum"),
+        Cost=("Cost", "sum"),
+        Reserved=("Reserved", "sum"),
+        Titles=("Title", lambda t: ", ".join(pd.unique(t)[:5])),
+    ).reset_index()
+    return pd.DataFrame({
+        "Category": agg["Category"],
+        "Start_dt": agg["Start_dt"],
+        "End_dt": agg["End_dt"],
+        "Title": agg["Events"].map(lambda n: f"{n} events" if n != 1 else "1 event"),
+        "Description": agg["Titles"],
+        "Duration (min)": agg["Minutes"].round().astype("Int64"),
+        "Scrap (m²)": agg["Scrap"].round(2),
+        "B-Grade (m²)": agg["BGrade"].round(2),
+        "Cost (€)": agg["Cost"].round(2),
+        "Reserved": agg["Reserved"].astype(int).astype(str) + " of " + agg["Events"].astype(str),
+    })
@@ -1,13 +1,18 @@
 import plotly.graph_objects as go
-import pandas as pd
+import numpy as np
 import os
 from utils.branding import add_logo_to_fig
+from utils.profiling import profiled
+from data.store import metric_values
+from plots.window import view_window, window_rows
+from plots.rollup import ROLLUP_METRICS, daily_rollup, rollup_window, title_totals
 
+@profiled()
 def plot_pareto(df, value_col, title, color_map):
     df = df.copy()
     df = df[df["Category"].notnull()]
-    df[value_col] = pd.to_numeric(df[value_col], errors="coerce").fillna(0)
-    agg = df.groupby("Category")[value_col].sum().sort_values(ascending=False)
+    df[value_col] = metric_values(df[value_col]).fillna(0)
+    agg = df.groupby("Category", observed=True)[value_col].sum().sort_values(ascending=False)
     bar_colors = [color_map.get(cat, "#888888") for cat in agg.index]
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -30,12 +35,13 @@ def plot_pareto(df, value_col, title, color_map):
         add_logo_to_fig(fig, logo_path)
     return fig
 
+@profiled()
 def plot_pareto_scrap_bgrade(df, color_map):
     df = df.copy()
-    df["Scrap (m²)"] = pd.to_numeric(df["Scrap (m²)"], errors="coerce").fillna(0)
-    df["B-Grade (m²)"] = pd.to_numeric(df["B-Grade (m²)"], errors="coerce").fillna(0)
+    df["Scrap (m²)"] = metric_values(df["Scrap (m²)"]).fillna(0)
+    df["B-Grade (m²)"] = metric_values(df["B-Grade (m²)"]).fillna(0)
     df["Total Scrap+B-Grade"] = df["Scrap (m²)"] + df["B-Grade (m²)"]
-    agg = df.groupby("Category")["Total Scrap+B-Grade"].sum().sort_values(ascending=False)
+    agg = df.groupby("Category", observed=True)["Total Scrap+B-Grade"].sum().sort_values(ascending=False)
     bar_colors = [color_map.get(cat, "#888888") for cat in agg.index]
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -58,70 +64,101 @@ def plot_pareto_scrap_bgrade(df, color_map):
         add_logo_to_fig(fig, logo_path)
     return fig
 
-def plot_pareto_by_title(df, value_col, title, color_map):
+# Bar color of the collapsed "Other" bucket
+OTHER_COLOR = "#888888"
+
+# Preset limits of the opt-in Top-N / cumulative-share Pareto modes in the
+# app; by default every title is shown
+PARETO_TOP_N = 20
+PARETO_TOP_SHARE = 80
+
+@profiled()
+def plot_pareto_by_title(df, value_col, title, color_map, top_n=None, top_share=None):
     df = df.copy()
     df = df[df["Title"].notnull()]
-    df[value_col] = pd.to_numeric(df[value_col], errors="coerce").fillna(0)
-    agg = df.groupby("Title")[value_col].sum().sort_values(ascending=False)
+    df[value_col] = metric_values(df[value_col]).fillna(0)
+    totals = df.groupby("Title", observed=True)[value_col].sum()
     title_to_cat = df.set_index("Title")["Category"].to_dict()
-    bar_colors = [color_map.get(title_to_cat.get(title, ""), "#888888") for title in agg.index]
-    fig = go.Figure()
-    fig.add_trace(go.Bar(
-        x=agg.index,
-        y=agg.values,
-        marker_color=bar_colors,
-        text=agg.values,
-        textposition="outside",
-        textfont=dict(size=22, family="Arial", color="black")
-    ))
-    fig.update_layout(
-        title=dict(text=title, font=dict(size=32, family="Arial", color="black")),
-        xaxis_title="Title",
-        yaxis_title=value_col,
-        font=dict(size=22, family="Arial", color="black"),
-        xaxis=dict(
-            title_font=dict(size=24, family="Arial", color="black"),
-            tickfont=dict(size=20, family="Arial", color="black"),
-        ),
-        yaxis=dict(
-            title_font=dict(size=24, family="Arial", color="black"),
-            tickfont=dict(size=20, family="Arial", color="black"),
-        ),
-        plot_bgcolor="#fafafa",
-        height=700,
-        margin=dict(l=60, r=40, t=80, b=80),
-        showlegend=False
-    )
-    logo_path = os.path.join(os.path.dirname(__file__), "wcm_logo.png")
-    if os.path.exists(logo_path):
-        add_logo_to_fig(fig, logo_path)
-    return fig
+    return _title_pareto_figure(totals, title_to_cat, color_map, title, value_col, top_n, top_share)
 
-def plot_pareto_scrap_bgrade_by_title(df, color_map):
+@profiled()
+def plot_pareto_scrap_bgrade_by_title(df, color_map, title="Pareto: Scrap + B-Grade (m²)", top_n=None, top_share=None):
     df = df.copy()
-    df["Scrap (m²)"] = pd.to_numeric(df["Scrap (m²)"], errors="coerce").fillna(0)
-    df["B-Grade (m²)"] = pd.to_numeric(df["B-Grade (m²)"], errors="coerce").fillna(0)
+    df["Scrap (m²)"] = metric_values(df["Scrap (m²)"]).fillna(0)
+    df["B-Grade (m²)"] = metric_values(df["B-Grade (m²)"]).fillna(0)
     df["Total Scrap+B-Grade"] = df["Scrap (m²)"] + df["B-Grade (m²)"]
-    agg = df.groupby("Title")["Total Scrap+B-Grade"].sum().sort_values(ascending=False)
+    totals = df.groupby("Title", observed=True)["Total Scrap+B-Grade"].sum()
     title_to_cat = df.set_index("Title")["Category"].to_dict()
-    bar_colors = [color_map.get(title_to_cat.get(title, ""), "#888888") for title in agg.index]
+    return _title_pareto_figure(totals, title_to_cat, color_map, title, "Scrap + B-Grade (m²)", top_n, top_share)
+
+def pareto_head(totals, top_n=None, top_share=None):
+    """
+    Largest totals in descending order, limited to top_n titles and/or to the
+    titles needed to reach top_share (0-1) of the overall sum, plus the sum
+    of the remaining titles. Only the kept titles are sorted (argpartition).
+    """
+    values = totals.to_numpy(dtype="float64")
+    limit = len(values) if top_n is None else min(top_n, len(values))
+    overall = values.sum()
+    k = limit if top_share is None else min(limit, 16)
+    while True:
+        if k < len(values):
+            top = np.argpartition(-values, k - 1)[:k]
+        else:
+            top = np.arange(len(values))
+        top = top[np.argsort(-values[top], kind="stable")]
+        if top_share is None or overall <= 0:
+            break
+        reached = np.flatnonzero(np.cumsum(values[top]) >= top_share * overall)
+        if len(reached):
+            top = top[:reached[0] + 1]
+            break
+        if k == limit:
+            break
+        k = min(2 * k, limit)
+    head = totals.iloc[top]
+    return head, overall - head.sum()
+
+@profiled("figure")
+def _title_pareto_figure(totals, title_to_cat, color_map, chart_title, value_label, top_n=None, top_share=None):
+    top_mode = top_n is not None or top_share is not None
+    if top_mode:
+        agg, other = pareto_head(totals, top_n, top_share)
+        n_other = len(totals) - len(agg)
+    else:
+        agg = totals.sort_values(ascending=False)
+    bar_colors = [color_map.get(title_to_cat.get(title, ""), OTHER_COLOR) for title in agg.index]
+    x = list(agg.index)
+    y = list(agg.values)
+    if top_mode and n_other:
+        x.append(f"Other ({n_other} titles)")
+        y.append(other)
+        bar_colors.append(OTHER_COLOR)
     fig = go.Figure()
     fig.add_trace(go.Bar(
-        x=agg.index,
-        y=agg.values,
+        x=x if top_mode else agg.index,
+        y=y if top_mode else agg.values,
         marker_color=bar_colors,
-        text=agg.values,
+        text=y if top_mode else agg.values,
         textposition="outside",
         textfont=dict(size=22, family="Arial", color="black")
     ))
-    # Accept dynamic title
-    chart_title = "Pareto: Scrap + B-Grade (m²)"
-    if hasattr(df, "_pareto_title"):
-        chart_title = df._pareto_title
+    if top_mode:
+        # Cumulative share of the overall total, on a secondary axis
+        overall = sum(y)
+        cumulative = np.cumsum(y) / overall * 100 if overall else np.zeros(len(y))
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=cumulative,
+            yaxis="y2",
+            mode="lines+markers",
+            line=dict(color="black", width=2),
+            hovertemplate="%{x}<br>Cumulative: %{y:.1f}%<extra></extra>"
+        ))
     fig.update_layout(
         title=dict(text=chart_title, font=dict(size=32, family="Arial", color="black")),
         xaxis_title="Title",
-        yaxis_title="Scrap + B-Grade (m²)",
+        yaxis_title=value_label,
         font=dict(size=22, family="Arial", color="black"),
         xaxis=dict(
             title_font=dict(size=24, family="Arial", color="black"),
@@ -136,48 +173,65 @@ def plot_pareto_scrap_bgrade_by_title(df, color_map):
         margin=dict(l=60, r=40, t=80, b=80),
         showlegend=False
     )
+    if top_mode:
+        fig.update_layout(
+            yaxis2=dict(
+                overlaying="y",
+                side="right",
+                range=[0, 105],
+                ticksuffix="%",
+                showgrid=False,
+                tickfont=dict(size=20, family="Arial", color="black"),
+            ),
+            margin=dict(l=60, r=80, t=80, b=80)
+        )
     logo_path = os.path.join(os.path.dirname(__file__), "wcm_logo.png")
     if os.path.exists(logo_path):
         add_logo_to_fig(fig, logo_path)
     return fig
 
-def plot_dynamic_pareto_by_title(df, value_col, view_mode, selected_date, color_map):
-    filtered_df, dynamic_title = filter_by_view(df, view_mode, selected_date)
-    chart_title = f"Pareto: {value_col} - {dynamic_title}"
-    return plot_pareto_by_title(filtered_df, value_col, chart_title, color_map)
-def filter_by_view(df, view_mode, selected_date):
-    df = df.copy()
-    from parsing.dates import parse_datetimes
-    from datetime import datetime
-    import pandas as pd
-    start_dt, _ = parse_datetimes(df)
+@profiled("totals")
+def _rollup_title_totals(df, metrics, view_mode, selected_date, rollup=None):
+    # Week/Month charts sum at most 31 daily partials instead of grouping the events
+    if rollup is None:
+        rollup = daily_rollup(df)
+    window_start, window_end = view_window(view_mode, selected_date)
+    totals, title_to_cat = title_totals(rollup_window(rollup, window_start, window_end), metrics)
+    return totals, title_to_cat, period_title(view_mode, selected_date)
+
+@profiled()
+def plot_dynamic_pareto_by_title(df, value_col, view_mode, selected_date, color_map, rollup=None, top_n=None, top_share=None):
+    if value_col not in ROLLUP_METRICS:
+        filtered_df, dynamic_title = filter_by_view(df, view_mode, selected_date)
+        return plot_pareto_by_title(filtered_df, value_col, f"Pareto: {value_col} - {dynamic_title}", color_map, top_n, top_share)
+    totals, title_to_cat, dynamic_title = _rollup_title_totals(
+        df, [ROLLUP_METRICS[value_col]], view_mode, selected_date, rollup
+    )
+    return _title_pareto_figure(
+        totals, title_to_cat, color_map, f"Pareto: {value_col} - {dynamic_title}", value_col, top_n, top_share
+    )
+
+def period_title(view_mode, selected_date):
     if view_mode == "Day":
-        day_start = datetime.combine(selected_date, datetime.min.time()) + pd.Timedelta(hours=5)
-        day_end = day_start + pd.Timedelta(days=1)
-        mask = (start_dt >= day_start) & (start_dt < day_end)
-        title = f"{selected_date.strftime('%d.%m.%Y')}"
-        return df[mask], title
+        return f"{selected_date.strftime('%d.%m.%Y')}"
     elif view_mode == "Week":
-        week_start = selected_date - pd.Timedelta(days=selected_date.weekday())
-        week_start = datetime.combine(week_start, datetime.min.time()) + pd.Timedelta(hours=5)
-        week_end = week_start + pd.Timedelta(days=7)
-        cw = week_start.isocalendar()[1]
-        mask = (start_dt >= week_start) & (start_dt < week_end)
-        title = f"CW {cw}"
-        return df[mask], title
+        return f"CW {view_window(view_mode, selected_date)[0].isocalendar()[1]}"
     else:  # Month
-        month_start = datetime(selected_date.year, selected_date.month, 1) + pd.Timedelta(hours=5)
-        if selected_date.month == 12:
-            next_month = datetime(selected_date.year + 1, 1, 1)
-        else:
-            next_month = datetime(selected_date.year, selected_date.month + 1, 1)
-        month_end = next_month + pd.Timedelta(hours=5)
-        mask = (start_dt >= month_start) & (start_dt < month_end)
-        title = f"{selected_date.strftime('%m.%Y')}"
-        return df[mask], title
+        return f"{selected_date.strftime('%m.%Y')}"
+
+@profiled()
+def filter_by_view(df, view_mode, selected_date):
+    # Same 05:00-shifted windows and time index as the timeline (plots.window)
+    # Table order is kept: title colors follow the last event of each title
+    rows, _ = window_rows(df, view_mode, selected_date, table_order=True)
+    return rows, period_title(view_mode, selected_date)
 
-def plot_dynamic_pareto_scrap_bgrade_by_title(df, view_mode, selected_date, color_map):
-    filtered_df, dynamic_title = filter_by_view(df, view_mode, selected_date)
-    filtered_df = filtered_df.copy()
-    filtered_df._pareto_title = f"Pareto: Scrap + B-Grade (m²) - {dynamic_title}"
-    return plot_pareto_scrap_bgrade_by_title(filtered_df, color_map)
+@profiled()
+def plot_dynamic_pareto_scrap_bgrade_by_title(df, view_mode, selected_date, color_map, rollup=None, top_n=None, top_share=None):
+    totals, title_to_cat, dynamic_title = _rollup_title_totals(
+        df, ["Scrap", "BGrade"], view_mode, selected_date, rollup
+    )
+    return _title_pareto_figure(
+        totals, title_to_cat, color_map, f"Pareto: Scrap + B-Grade (m²) - {dynamic_title}",
+        "Scrap + B-Grade (m²)", top_n, top_share
+    )
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from plots.cache import FigureCache, cached_figure, figure_key
+
+# Background threads building figures ahead of time (shared by all sessions)
+PREFETCH_WORKERS = 2
+# Figures kept per session
+PREFETCH_CACHE_SIZE = 24
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="figure-prefetch")
+
+
+class FigurePrefetcher:
+    """
+    Session-scoped figure cache for one version of the event table (content
+    hash digest) that can also be filled in the background. A figure that is
+    still being prefetched is waited for instead of being built twice.
+    Replace the prefetcher when the table changes; its figures are dropped
+    with it.
+    """
+
+    def __init__(self, digest, maxsize=PREFETCH_CACHE_SIZE):
+        self.digest = digest
+        self.cache = FigureCache(maxsize)
+        self._pending = {}
+        self._lock = Lock()
+
+    def figure(self, build, df, *args, **kwargs):
+        """
+        build(df, *args, **kwargs) from the cache, from a running prefetch or
+        built now.
+        """
+        with self._lock:
+            future = self._pending.get(figure_key(build, self.digest, args, kwargs))
+        if future is not None and not future.cancelled():
+            return future.result()
+        return cached_figure(build, df, *args, digest=self.digest, cache=self.cache, **kwargs)
+
+    def prefetch(self, build, df, *args, **kwargs):
+        """
+        Queue build(df, *args, **kwargs) on the background threads unless it
+        is cached or already queued.
+        """
+        key = figure_key(build, self.digest, args, kwargs)
+        with self._lock:
+            if key in self._pending or key in self.cache:
+                return
+            future = _executor.submit(
+                cached_figure, build, df, *args, digest=self.digest, cache=self.cache, **kwargs
+            )
+            self._pending[key] = future
+        future.add_done_callback(lambda _: self._done(key))
+
+    def _done(self, key):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def cancel(self):
+        """
+        Drop queued prefetches that have not started yet.
+        """
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from data.store import is_event_store, metric_values
+from parsing.dates import parse_datetimes
+from plots.window import DAY_START
+
+# Metric columns of the event table and their summed column in the rollup
+ROLLUP_METRICS = {
+    "Cost (€)": "Cost",
+    "Scrap (m²)": "Scrap",
+    "B-Grade (m²)": "BGrade",
+}
+ROLLUP_COLUMNS = ["Day", "Title", "Category", "Cost", "Scrap", "BGrade", "Minutes", "Events", "Last"]
+
+
+def production_days(start_dt):
+    """
+    Start (at DAY_START) of the production day each timestamp belongs to.
+    """
+    return (start_dt - DAY_START).dt.floor("D") + DAY_START
+
+
+def daily_rollup(df, labels=None):
+    """
+    Sums of Cost, Scrap, B-Grade, duration minutes and event count per
+    (production day, Title, Category), sorted by Day. Last is the largest
+    table position in the group, so the latest event of a title can still be
+    found. With labels, only the rows at those index labels are rolled up.
+    """
+    if is_event_store(df):
+        start_dt, end_dt = df["Start_dt"], df["End_dt"]
+    else:
+        start_dt, end_dt = parse_datetimes(df)
+    work = pd.DataFrame({
+        "Day": production_days(start_dt),
+        "Title": df["Title"].astype(object),
+        "Category": df["Category"].astype(object),
+        "Cost": metric_values(df["Cost (€)"]).fillna(0),
+        "Scrap": metric_values(df["Scrap (m²)"]).fillna(0),
+        "BGrade": metric_values(df["B-Grade (m²)"]).fillna(0),
+        "Minutes": (end_dt - start_dt).dt.total_seconds() / 60,
+        "Events": 1,
+        "Last": np.arange(len(df)),
+    }, index=df.index)
+    if labels is not None:
+        work = work.loc[labels]
+    work = work[work["Day"].notna()]
+    rollup = work.groupby(["Day", "Title", "Category"], sort=False, dropna=False).agg(
+        Cost=("Cost", "sum"),
+        Scrap=("Scrap", "sum"),
+        BGrade=("BGrade", "sum"),
+        Minutes=("Minutes", "sum"),
+        Events=("Events", "sum"),
+        Last=("Last", "max"),
+    ).reset_index()
+    return rollup.sort_values("Day", kind="stable", ignore_index=True)[ROLLUP_COLUMNS]
+
+
+def update_daily_rollup(rollup, old_df, new_df, labels):
+    """
+    Rollup of new_df from the rollup of old_df, re-aggregating only the
+    production days of the rows at labels (before and after the edit).
+    Deleting rows shifts table positions, so that falls back to a rebuild.
+    """
+    if len(old_df.index.difference(new_df.index)):
+        return daily_rollup(new_df)
+    labels = pd.Index(labels).union(new_df.index.difference(old_df.index))
+    if not len(labels):
+        return rollup
+    old_labels = labels.intersection(old_df.index)
+    if is_event_store(new_df):
+        old_start = old_df.loc[old_labels, "Start_dt"]
+        new_start = new_df["Start_dt"]
+    else:
+        old_start = parse_datetimes(old_df.loc[old_labels])[0]
+        new_start = parse_datetimes(new_df)[0]
+    new_days = production_days(new_start)
+    days = pd.Index(production_days(old_start).dropna()).union(pd.Index(new_days.loc[labels].dropna()))
+    kept = rollup[~rollup["Day"].isin(days)]
+    redone = daily_rollup(new_df, new_df.index[new_days.isin(days).to_numpy()])
+    merged = pd.concat([kept, redone], ignore_index=True)
+    return merged.sort_values("Day", kind="stable", ignore_index=True)
+
+
+def rollup_window(rollup, start, end):
+    """
+    Rollup rows of the production days in [start, end).
+    """
+    days = rollup["Day"].to_numpy(dtype="datetime64[ns]")
+    lo, hi = np.searchsorted(days, np.array([start, end], dtype="datetime64[ns]"))
+    return rollup.iloc[lo:hi]
+
+
+def title_totals(rollup, metrics):
+    """
+    Per-title sum of the given rollup metrics and the category of each
+    title's latest event.
+    """
+    rollup = rollup[rollup["Title"].notnull()]
+    totals = rollup[metrics].sum(axis=1)
+    agg = totals.groupby(rollup["Title"]).sum()
+    latest = rollup.sort_values("Last", kind="stable").drop_duplicates("Title", keep="last")
+    title_to_cat = dict(zip(latest["Title"], latest["Category"]))
+    return agg, title_to_cat
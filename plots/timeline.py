@@ -1,48 +1,49 @@
 import plotly.graph_objects as go
 import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import timedelta
+import copy
 import os
+from functools import lru_cache
 import pandas as pd
-from parsing.dates import parse_datetimes
+from data.store import display_text, is_event_store, metric_values, to_display
+from plots.lanes import assign_sublanes, assign_day_lanes
+from plots.intervals import SwimlaneIntervals
+from plots.lod import use_lod, aggregate_events, LOD_BUCKET_NAMES
+from plots.webgl import use_webgl, webgl_timeline_traces
+from plots.window import window_rows
 from utils.colors import get_color
 from utils.branding import add_logo_to_fig
+from utils.profiling import lap, profiled
 
-def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show_minutes=True, show_scrap=True, show_costs=True, show_reserved=True):
+# Number of (view_mode, period) layout templates kept in memory
+TEMPLATE_CACHE_SIZE = 32
+
+# Columns shown in block annotations and hover labels
+LABEL_COLUMNS = ["Title", "Description", "Duration (min)", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)"]
+
+@profiled()
+def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show_minutes=True, show_scrap=True, show_costs=True, show_reserved=True, detail="auto", lod_threshold=None, renderer="svg"):
+    """
+    Build the timeline figure for the Day/Week/Month window around selected_date.
+    renderer: "svg" (px.timeline bars with placed text annotations), "webgl"
+    (Scattergl blocks, block text shown on hover) or "auto" (WebGL above
+    plots.webgl.WEBGL_ROW_THRESHOLD blocks).
+    """
     if df.empty:
         return go.Figure()
-    df = df.copy()
-    df["Start_dt"], df["End_dt"] = parse_datetimes(df)
-    df["Color"] = df["Category"].map(lambda c: get_color(c, color_map))
+    # Rows inside the window come from the shared time index (binary search
+    # over Start_dt); only those rows are copied and formatted
+    df, (window_start, window_end) = window_rows(df, view_mode, selected_date)
+    xaxis_range = [window_start, window_end]
 
     # Only keep rows with valid datetimes and positive duration
-    df = df[
-        df["Start_dt"].notnull() &
-        df["End_dt"].notnull() &
-        (df["End_dt"] > df["Start_dt"])
-    ]
-
-    # Filter by selected date/range using Start_dt
-    if view_mode == "Day":
-        day_start = datetime.combine(selected_date, datetime.min.time()) + timedelta(hours=5)
-        day_end = day_start + timedelta(days=1)
-        xaxis_range = [day_start, day_end]
-        mask = (df["Start_dt"] >= day_start) & (df["Start_dt"] < day_end)
-    elif view_mode == "Week":
-        week_start = selected_date - timedelta(days=selected_date.weekday())
-        week_start = datetime.combine(week_start, datetime.min.time()) + timedelta(hours=5)
-        week_end = week_start + timedelta(days=7)
-        xaxis_range = [week_start, week_end]
-        mask = (df["Start_dt"] >= week_start) & (df["Start_dt"] < week_end)
-    else:  # Month
-        month_start = datetime(selected_date.year, selected_date.month, 1) + timedelta(hours=5)
-        if selected_date.month == 12:
-            next_month = datetime(selected_date.year + 1, 1, 1)
-        else:
-            next_month = datetime(selected_date.year, selected_date.month + 1, 1)
-        month_end = next_month + timedelta(hours=5)
-        xaxis_range = [month_start, month_end]
-        mask = (df["Start_dt"] >= month_start) & (df["Start_dt"] < month_end)
-    df = df[mask]
+    df = df[df["End_dt"].notnull() & (df["End_dt"] > df["Start_dt"])]
+    if is_event_store(df):
+        df = to_display(df, keep_datetimes=True)
+    else:
+        df = df.copy()
+    df["Color"] = df["Category"].map(lambda c: get_color(c, color_map))
+    lap("window")
 
     if df.empty:
         fig = go.Figure()
@@ -55,106 +56,79 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
         )
         return fig
 
+    # Level of detail: dense Week/Month windows are merged into per-shift/per-day
+    # blocks per category; detail="full" forces one block per event
+    aggregated = use_lod(view_mode, len(df), detail, lod_threshold)
+    if aggregated:
+        df = aggregate_events(df, view_mode, xaxis_range[0])
+        df["Color"] = df["Category"].map(lambda c: get_color(c, color_map))
+    lap("lod")
+
     # --- Advanced swimlane assignment for monthly view ---
     df = df.sort_values(["Category", "Start_dt", "End_dt"])
     df["SubLane"] = 0
     if view_mode == "Month":
-        # Assign swimlanes so that events from the same category on the same day get separate lanes,
+        # Events from the same category on the same day get separate lanes,
         # but events from other days reuse lanes if possible.
-        swimlane_map = {}
-        for cat in df["Category"].unique():
-            cat_df = df[df["Category"] == cat]
-            lanes = []
-            for idx, row in cat_df.iterrows():
-                event_day = row["Start_dt"].date()
-                placed = False
-                # Try to place in an existing lane if no overlap on that day
-                for i, lane in enumerate(lanes):
-                    # Check if any event in this lane is on the same day
-                    if not any(ev["Start_dt"].date() == event_day for ev in lane):
-                        lane.append(row)
-                        df.at[idx, "SubLane"] = i
-                        placed = True
-                        break
-                if not placed:
-                    lanes.append([row])
-                    df.at[idx, "SubLane"] = len(lanes) - 1
-            swimlane_map[cat] = len(lanes)
+        df["SubLane"] = assign_day_lanes(df["Category"], df["Start_dt"])
     else:
-        # Default: assign swimlanes for overlapping events as before
-        for cat in df["Category"].unique():
-            cat_df = df[df["Category"] == cat]
-            sublanes = []
-            for idx, row in cat_df.iterrows():
-                placed = False
-                for i, lane in enumerate(sublanes):
-                    if row["Start_dt"] >= lane[-1]["End_dt"]:
-                        lane.append(row)
-                        df.at[idx, "SubLane"] = i
-                        placed = True
-                        break
-                if not placed:
-                    sublanes.append([row])
-                    df.at[idx, "SubLane"] = len(sublanes) - 1
+        # Default: spread overlapping events of a category over sub-lanes (first fit)
+        df["SubLane"] = assign_sublanes(df["Category"], df["Start_dt"], df["End_dt"])
 
     # Only add SubLane number if there is more than one for this category
-    def swimlane_label(row):
-        cat = row["Category"]
-        max_sublane = df[df["Category"] == cat]["SubLane"].max()
-        if max_sublane > 0:
-            return f"{cat} {row['SubLane']+1}"
-        else:
-            return cat
-    df["Swimlane"] = df.apply(swimlane_label, axis=1)
+    df["Swimlane"] = swimlane_labels(df["Category"], df["SubLane"])
+    lap("lanes")
 
     # Prepare custom text for each block based on toggles
-    def build_block_text(row):
-        parts = []
-        if show_title:
-            parts.append(f"<b style='font-size:22px;display:block;text-align:center'>{row['Title']}</b>")
-        details = []
-        if show_minutes:
-            details.append(f"Duration: {row['Duration (min)']} min")
-        if show_scrap:
-            scrap = pd.to_numeric(row["Scrap (m²)"], errors="coerce")
-            bgrade = pd.to_numeric(row["B-Grade (m²)"], errors="coerce")
-            total_scrap = int((scrap if not pd.isnull(scrap) else 0) + (bgrade if not pd.isnull(bgrade) else 0))
-            details.append(f"Scrap + B-Grade: {total_scrap} m²")
-        if show_costs:
-            details.append(f"Total Costs: {row['Cost (€)']} €")
-        if show_reserved:
-            details.append(f"Reserved: {row['Reserved']}")
-        if details:
-            parts.append("<span style='display:block;text-align:left'>" + "<br>".join(details) + "</span>")
-        return "<br>".join(parts)
-    df["BlockText"] = df.apply(build_block_text, axis=1)
-
-    fig = px.timeline(
-        df,
-        x_start="Start_dt",
-        x_end="End_dt",
-        y="Swimlane",
-        color="Category",
-        text=None,  # We'll use custom annotations instead of text
-        hover_data=["Title", "Description", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)"],
-        category_orders={"Swimlane": list(df["Swimlane"].unique()), "Category": list(df["Category"].unique())}
+    scrap_total = scrap_totals(df)
+    # Block and hover texts show missing values as blanks and whole numbers without ".0"
+    for col in LABEL_COLUMNS:
+        df[col] = display_text(df[col])
+    df["BlockText"] = build_block_texts(
+        df, scrap_total,
+        show_title=show_title,
+        show_minutes=show_minutes,
+        show_scrap=show_scrap,
+        show_costs=show_costs,
+        show_reserved=show_reserved
     )
+    df["CommentWidth"] = estimate_comment_widths(scrap_total)
+    lap("text")
+
+    lane_order = list(df["Swimlane"].unique())
+    webgl = use_webgl(renderer, len(df))
+    if webgl:
+        fig = go.Figure(webgl_timeline_traces(df, lane_order, list(df["Category"].unique())))
+    else:
+        fig = px.timeline(
+            df,
+            x_start="Start_dt",
+            x_end="End_dt",
+            y="Swimlane",
+            color="Category",
+            text=None,  # We'll use custom annotations instead of text
+            hover_data=["Title", "Description", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)"],
+            category_orders={"Swimlane": lane_order, "Category": list(df["Category"].unique())}
+        )
+    lap("traces")
 
     # Get the x-axis range for positioning
     x_min, x_max = xaxis_range
 
-    # Helper to estimate text width in px based on "Scrap + B-Grade: XXXXX m²"
-    def estimate_comment_width(row, font_size=18):
-        scrap = pd.to_numeric(row["Scrap (m²)"], errors="coerce")
-        bgrade = pd.to_numeric(row["B-Grade (m²)"], errors="coerce")
-        total = int((scrap if not pd.isnull(scrap) else 0) + (bgrade if not pd.isnull(bgrade) else 0))
-        line = f"Scrap + B-Grade: {total} m²"
-        return int(len(line) * font_size * 0.5) + 10
+    # Annotations and shapes are collected as plain dicts and assigned to the
+    # layout once; per-call add_annotation/add_vrect validation dominates otherwise
+    annotations = []
+    shapes = []
 
-    annotation_rects = []
-    block_rects = [(row["Start_dt"], row["End_dt"], row["Swimlane"]) for _, row in df.iterrows()]
+    # Per-swimlane interval indexes for collision checks
+    annotation_rects = SwimlaneIntervals()
+    block_rects = SwimlaneIntervals()
+    for bx0, bx1, byval in zip(df["Start_dt"], df["End_dt"], df["Swimlane"]):
+        block_rects.add(byval, bx0, bx1)
 
-    for i, row in df.iterrows():
+    # WebGL blocks carry their text in the hover instead of placed annotations
+    annotated_df = df.iloc[0:0] if webgl else df
+    for i, row in annotated_df.iterrows():
         x0 = row["Start_dt"]
         x1 = row["End_dt"]
         yval = row["Swimlane"]
@@ -163,17 +137,14 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
         min_width_minutes = 30  # allow tighter fit
         block_minutes = (x1 - x0).total_seconds() / 60
 
-        width_px = estimate_comment_width(row)
+        width_px = row["CommentWidth"]
         width_td = timedelta(hours=width_px / 100)
 
         # 0. Try inside (at least 120 mins)
         if block_minutes >= 120:
-            annotation_overlap = any(
-                (x0 < ax1 and x1 > ax0 and yval == ayval)
-                for ax0, ax1, ayval in annotation_rects
-            )
+            annotation_overlap = annotation_rects.overlaps(yval, x0, x1)
             if not annotation_overlap:
-                fig.add_annotation(
+                annotations.append(dict(
                     x=x_center,
                     y=yval,
                     text=row["BlockText"],
@@ -186,26 +157,21 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
                     bordercolor="#888",
                     borderwidth=1,
                     borderpad=4,
-                    width=None,
-                    height=None,
                     opacity=1,
-                )
-                annotation_rects.append((x0, x1, yval))
+                ))
+                annotation_rects.add(yval, x0, x1)
                 continue
 
         # 1. Try right (use chart edge, min_width_minutes buffer)
         right_x0 = x1 + timedelta(minutes=10)
         right_x1 = right_x0 + width_td
         right_space = (right_x1 < x_max) and ((x_max - right_x1).total_seconds() / 60 >= min_width_minutes)
-        right_overlap = any(
-            (right_x0 < bx1 and right_x1 > bx0 and byval == yval)
-            for bx0, bx1, byval in block_rects
-        ) or any(
-            (right_x0 < ax1 and right_x1 > ax0 and yval == ayval)
-            for ax0, ax1, ayval in annotation_rects
+        right_overlap = (
+            block_rects.overlaps(yval, right_x0, right_x1)
+            or annotation_rects.overlaps(yval, right_x0, right_x1)
         )
         if right_space and not right_overlap:
-            fig.add_annotation(
+            annotations.append(dict(
                 x=right_x0,
                 y=yval,
                 text=row["BlockText"],
@@ -227,23 +193,20 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
                 borderpad=4,
                 width=width_px,
                 opacity=1,
-            )
-            annotation_rects.append((right_x0, right_x1, yval))
+            ))
+            annotation_rects.add(yval, right_x0, right_x1)
             continue
 
         # 2. Try left (use chart edge, min_width_minutes buffer)
         left_x1 = x0 - timedelta(minutes=10)
         left_x0 = left_x1 - width_td
         left_space = (left_x0 > x_min) and ((left_x0 - x_min).total_seconds() / 60 >= min_width_minutes)
-        left_overlap = any(
-            (left_x0 < bx1 and left_x1 > bx0 and byval == yval)
-            for bx0, bx1, byval in block_rects
-        ) or any(
-            (left_x0 < ax1 and left_x1 > ax0 and yval == ayval)
-            for ax0, ax1, ayval in annotation_rects
+        left_overlap = (
+            block_rects.overlaps(yval, left_x0, left_x1)
+            or annotation_rects.overlaps(yval, left_x0, left_x1)
         )
         if left_space and not left_overlap:
-            fig.add_annotation(
+            annotations.append(dict(
                 x=left_x0,
                 y=yval,
                 text=row["BlockText"],
@@ -265,18 +228,16 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
                 borderpad=4,
                 width=width_px,
                 opacity=1,
-            )
-            annotation_rects.append((left_x0, left_x1, yval))
+            ))
+            annotation_rects.add(yval, left_x0, left_x1)
             continue
 
         # 3. Try above (use chart edge, min_width_minutes buffer)
-        above_overlap = any(
-            (abs(x_center - ax0) < width_td and yval == ayval)
-            for ax0, ax1, ayval in annotation_rects
-        )
+        # i.e. an annotation in this lane starting within width_td of the block center
+        above_overlap = annotation_rects.starts_within(yval, x_center - width_td, x_center + width_td)
         above_space = True  # always possible in pixel space
         if above_space and not above_overlap:
-            fig.add_annotation(
+            annotations.append(dict(
                 x=x_center,
                 y=yval,
                 text=row["BlockText"],
@@ -297,17 +258,13 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
                 borderpad=4,
                 width=width_px,
                 opacity=1,
-            )
-            annotation_rects.append((x_center, x_center, yval))
+            ))
+            annotation_rects.add(yval, x_center, x_center)
             continue
 
         # 4. Try below (use chart edge, min_width_minutes buffer)
-        below_overlap = any(
-            (abs(x_center - ax0) < width_td and yval == ayval)
-            for ax0, ax1, ayval in annotation_rects
-        )
         below_space = True  # always possible in pixel space
-        fig.add_annotation(
+        annotations.append(dict(
             x=x_center,
             y=yval,
             text=row["BlockText"],
@@ -328,11 +285,15 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
             borderpad=4,
             width=width_px,
             opacity=1,
-        )
-        annotation_rects.append((x_center, x_center, yval))
+        ))
+        annotation_rects.add(yval, x_center, x_center)
         # Always place below if all else fails
+    lap("annotations")
 
-    # --- Custom x-axis ticks for Month view ---
+    # Ticks, shift/weekend rectangles and axis styling come from the cached
+    # per-period template; only Month view adds data-dependent ticks
+    template = timeline_template(view_mode, x_min, x_max)
+    xaxis = template["xaxis"]
     if view_mode == "Month":
         # Get all unique days with events
         event_days = sorted(df["Start_dt"].dt.floor("D").unique())
@@ -347,95 +308,103 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
                 ticktext.append(d.strftime("%d.%m"))
         tickvals.append(month_end)
         ticktext.append(month_end.strftime("%d.%m"))
-        fig.update_xaxes(
-            range=xaxis_range,
-            tickvals=tickvals,
-            ticktext=ticktext,
-            tickformat=None,
-            dtick=None,
-            showgrid=True,
-            gridcolor="#e0e0e0",
-            gridwidth=1
-        )
-    elif view_mode == "Day":
-        # ...existing code for Day view ticks...
+        xaxis.update(tickvals=tickvals, ticktext=ticktext)
+    shapes.extend(template["shapes"])
+    yaxis = template["yaxis"]
+    if webgl:
+        # Numeric swimlane axis: lane i at y=i, labelled with its swimlane name
+        xaxis["type"] = "date"
+        yaxis.update(tickmode="array", tickvals=list(range(len(lane_order))), ticktext=[str(lane) for lane in lane_order])
+
+    # Format the timeline title as requested
+    if view_mode == "Day":
+        timeline_title = f"Timeline View: WCM Losses {selected_date.strftime('%d.%m.%Y')}"
+    elif view_mode == "Month":
+        timeline_title = f"Timeline View: WCM Losses {selected_date.strftime('%m.%Y')}"
+    elif view_mode == "Week":
+        cw = window_start.isocalendar()[1]
+        timeline_title = f"Timeline View: WCM Losses CW {cw}"
+    else:
+        timeline_title = f"Timeline View: WCM Losses"
+    if aggregated:
+        timeline_title += f" (aggregated per {LOD_BUCKET_NAMES[view_mode]})"
+    lap("ticks")
+
+    fig.update_layout(
+        annotations=annotations,
+        shapes=shapes,
+        xaxis=xaxis,
+        yaxis=yaxis,
+        height=600 + 60 * len(df["Swimlane"].unique()),
+        title=dict(
+            text=timeline_title,
+            font=dict(size=32, family="Arial", color="black")
+        ),
+        **template["layout"]
+    )
+
+    # Add logo to timeline view
+    logo_path = os.path.join(os.path.dirname(__file__), "wcm_logo.png")
+    if os.path.exists(logo_path):
+        add_logo_to_fig(fig, logo_path)
+    lap("layout")
+
+    return fig
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _layout_template(view_mode, period_start, period_end):
+    xaxis = dict(
+        range=[period_start, period_end],
+        tickformat=None,
+        dtick=None,
+        showgrid=True,
+        gridcolor="#e0e0e0",
+        gridwidth=1
+    )
+    shapes = []
+    shift_colors = ["#C1E5F5", "#F2CFEE", "#D9F2D0"]
+    if view_mode == "Day":
         tickvals = []
         ticktext = []
-        current = xaxis_range[0]
-        while current <= xaxis_range[1]:
+        current = period_start
+        while current <= period_end:
             tickvals.append(current)
-            if current.hour == 5 or (current.hour == 0 and current != xaxis_range[0]):
+            if current.hour == 5 or (current.hour == 0 and current != period_start):
                 ticktext.append(current.strftime("%d.%m<br>%H:%M"))
             else:
                 ticktext.append(current.strftime("%H:%M"))
             current += timedelta(hours=1)
-        fig.update_xaxes(
-            range=xaxis_range,
-            tickvals=tickvals,
-            ticktext=ticktext,
-            tickformat=None,
-            dtick=3600000,
-            showgrid=True,
-            gridcolor="#e0e0e0",
-            gridwidth=1
-        )
+        xaxis.update(tickvals=tickvals, ticktext=ticktext, dtick=3600000)
         # Add shift indication for the day (same colors as week view)
-        shift_colors = ["#C1E5F5", "#F2CFEE", "#D9F2D0"]
-        day_start = xaxis_range[0]
+        day_start = period_start
         shift1_start = day_start
         shift1_end = day_start + timedelta(hours=8)
         shift2_start = shift1_end
         shift2_end = shift2_start + timedelta(hours=8)
         shift3_start = shift2_end
         shift3_end = day_start + timedelta(days=1)
-        fig.add_vrect(
-            x0=shift1_start, x1=shift1_end,
-            fillcolor=shift_colors[0], opacity=0.18, layer="below", line_width=0
-        )
-        fig.add_vrect(
-            x0=shift2_start, x1=shift2_end,
-            fillcolor=shift_colors[1], opacity=0.18, layer="below", line_width=0
-        )
-        fig.add_vrect(
-            x0=shift3_start, x1=shift3_end,
-            fillcolor=shift_colors[2], opacity=0.18, layer="below", line_width=0
-        )
-    else:
+        shapes.append(_vrect(shift1_start, shift1_end, shift_colors[0], 0.18))
+        shapes.append(_vrect(shift2_start, shift2_end, shift_colors[1], 0.18))
+        shapes.append(_vrect(shift3_start, shift3_end, shift_colors[2], 0.18))
+    elif view_mode == "Week":
         # Week view: only show 05:00 at the start of each day as ticks
         tickvals = []
         ticktext = []
-        week_start = xaxis_range[0]
-        week_end = xaxis_range[1]
+        week_start = period_start
+        week_end = period_end
         current = week_start
         while current < week_end:
             tickvals.append(current)
             ticktext.append(current.strftime("%d.%m<br>05:00"))
             current += timedelta(days=1)
-        fig.update_xaxes(
-            range=xaxis_range,
-            tickvals=tickvals,
-            ticktext=ticktext,
-            tickformat=None,
-            dtick=None,
-            showgrid=True,
-            gridcolor="#e0e0e0",
-            gridwidth=1
-        )
+        xaxis.update(tickvals=tickvals, ticktext=ticktext)
         # Highlight last 2 days (weekend) with a darker grey rectangle
         sat_start = week_start + timedelta(days=5)
         sun_start = week_start + timedelta(days=6)
         mon_end = week_end
-        fig.add_vrect(
-            x0=sat_start, x1=sun_start,
-            fillcolor="#888888", opacity=0.45, layer="below", line_width=0
-        )
-        fig.add_vrect(
-            x0=sun_start, x1=mon_end,
-            fillcolor="#444444", opacity=0.45, layer="below", line_width=0
-        )
+        shapes.append(_vrect(sat_start, sun_start, "#888888", 0.45))
+        shapes.append(_vrect(sun_start, mon_end, "#444444", 0.45))
         # Add shift indication for each day (3 shifts: 05:00-13:00, 13:00-21:00, 21:00-05:00 next day)
-        # Use new colors
-        shift_colors = ["#C1E5F5", "#F2CFEE", "#D9F2D0"]
         for d in range(7):
             day_start = week_start + timedelta(days=d)
             shift1_start = day_start
@@ -444,58 +413,102 @@ def plot_timeline(df, view_mode, selected_date, color_map, show_title=True, show
             shift2_end = shift2_start + timedelta(hours=8)
             shift3_start = shift2_end
             shift3_end = day_start + timedelta(days=1)
-            fig.add_vrect(
-                x0=shift1_start, x1=shift1_end,
-                fillcolor=shift_colors[0], opacity=0.18, layer="below", line_width=0
-            )
-            fig.add_vrect(
-                x0=shift2_start, x1=shift2_end,
-                fillcolor=shift_colors[1], opacity=0.18, layer="below", line_width=0
-            )
-            fig.add_vrect(
-                x0=shift3_start, x1=shift3_end,
-                fillcolor=shift_colors[2], opacity=0.18, layer="below", line_width=0
-            )
-
-    # Add horizontal grid lines for swimlanes
-    yvals = list(range(len(df["Swimlane"].unique())))
-    fig.update_yaxes(
+            shapes.append(_vrect(shift1_start, shift1_end, shift_colors[0], 0.18))
+            shapes.append(_vrect(shift2_start, shift2_end, shift_colors[1], 0.18))
+            shapes.append(_vrect(shift3_start, shift3_end, shift_colors[2], 0.18))
+    # Horizontal grid lines for swimlanes
+    yaxis = dict(
         autorange="reversed",
         showgrid=True,
         gridcolor="#cccccc",
         gridwidth=2,
         tickfont=dict(size=18, family="Arial", color="black")  # 'bold' removed
     )
-
-    # Format the timeline title as requested
-    if view_mode == "Day":
-        timeline_title = f"Timeline View: WCM Losses {selected_date.strftime('%d.%m.%Y')}"
-    elif view_mode == "Month":
-        timeline_title = f"Timeline View: WCM Losses {selected_date.strftime('%m.%Y')}"
-    elif view_mode == "Week":
-        cw = week_start.isocalendar()[1]
-        timeline_title = f"Timeline View: WCM Losses CW {cw}"
-    else:
-        timeline_title = f"Timeline View: WCM Losses"
-
-    fig.update_layout(
-        height=600 + 60 * len(df["Swimlane"].unique()),
+    layout = dict(
         margin=dict(l=80, r=40, t=40, b=40),
-        title=dict(
-            text=timeline_title,
-            font=dict(size=32, family="Arial", color="black")
-        ),
         showlegend=False,
         font=dict(size=20, family="Arial", color="black"),
         plot_bgcolor="#fafafa"
     )
+    return {"xaxis": xaxis, "yaxis": yaxis, "shapes": shapes, "layout": layout}
 
-    # Add logo to timeline view
-    logo_path = os.path.join(os.path.dirname(__file__), "wcm_logo.png")
-    if os.path.exists(logo_path):
-        add_logo_to_fig(fig, logo_path)
+def timeline_template(view_mode, period_start, period_end):
+    """
+    Data-independent layout skeleton for a view period: x-axis ticks and
+    styling, shift/weekend rectangles, y-axis styling and base layout.
+    Built once per (view_mode, period start) and kept in an LRU cache;
+    a deep copy is returned so callers can extend it.
+    """
+    return copy.deepcopy(_layout_template(view_mode, period_start, period_end))
+
+def _vrect(x0, x1, fillcolor, opacity):
+    """
+    Layout shape dict equivalent to fig.add_vrect(..., layer="below", line_width=0).
+    """
+    return dict(
+        type="rect",
+        xref="x", yref="y domain",
+        x0=x0, x1=x1, y0=0, y1=1,
+        fillcolor=fillcolor, opacity=opacity,
+        layer="below", line=dict(width=0)
+    )
+
+
+def swimlane_labels(categories, sublanes):
+    """
+    "Category N" for categories spread over several sub-lanes, plain category otherwise.
+    """
+    max_sublane = sublanes.groupby(categories).transform("max")
+    numbered = categories.map(str) + " " + (sublanes + 1).map(str)
+    return numbered.where(max_sublane > 0, categories)
+
+
+def scrap_totals(df):
+    """
+    Scrap + B-Grade per row as int (missing/invalid values count as 0).
+    """
+    scrap = metric_values(df["Scrap (m²)"])
+    bgrade = metric_values(df["B-Grade (m²)"])
+    return (scrap.fillna(0) + bgrade.fillna(0)).astype("int64")
+
+
+def _join(series_list, sep):
+    joined = series_list[0]
+    for s in series_list[1:]:
+        joined = joined + sep + s
+    return joined
+
+
+def build_block_texts(df, scrap_total, show_title=True, show_minutes=True, show_scrap=True, show_costs=True, show_reserved=True):
+    """
+    Annotation HTML for every block, built column-wise from the enabled toggles.
+    """
+    parts = []
+    if show_title:
+        parts.append("<b style='font-size:22px;display:block;text-align:center'>" + df["Title"].map(str) + "</b>")
+    details = []
+    if show_minutes:
+        details.append("Duration: " + df["Duration (min)"].map(str) + " min")
+    if show_scrap:
+        details.append("Scrap + B-Grade: " + scrap_total.map(str) + " m²")
+    if show_costs:
+        details.append("Total Costs: " + df["Cost (€)"].map(str) + " €")
+    if show_reserved:
+        details.append("Reserved: " + df["Reserved"].map(str))
+    if details:
+        parts.append("<span style='display:block;text-align:left'>" + _join(details, "<br>") + "</span>")
+    if not parts:
+        return pd.Series("", index=df.index)
+    return _join(parts, "<br>")
+
+
+def estimate_comment_widths(scrap_total, font_size=18):
+    """
+    Estimated annotation width in px, based on the "Scrap + B-Grade: XXXXX m²" line.
+    """
+    line_len = len("Scrap + B-Grade:  m²") + scrap_total.map(str).str.len()
+    return (line_len * font_size * 0.5).astype("int64") + 10
 
-    return fig
 
 def compute_timeline(df, view_mode, selected_date, color_map):
     return plot_timeline(df, view_mode, selected_date, color_map)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# With renderer="auto", timelines with more blocks than this are drawn with WebGL
+WEBGL_ROW_THRESHOLD = 2000
+
+# Half the height of a block in swimlane units
+BAR_HALF_HEIGHT = 0.4
+
+HOVER_COLUMNS = ["Title", "Description", "Scrap (m²)", "B-Grade (m²)", "Reserved", "Cost (€)"]
+
+
+def use_webgl(renderer, n_blocks):
+    """
+    renderer: "svg", "webgl" or "auto" (WebGL above WEBGL_ROW_THRESHOLD blocks).
+    """
+    if renderer == "webgl":
+        return True
+    if renderer == "auto":
+        return n_blocks > WEBGL_ROW_THRESHOLD
+    return False
+
+
+def _epoch_ms(values):
+    return values.astype("datetime64[ns]").astype("int64") / 1e6
+
+
+def webgl_timeline_traces(df, lane_order, category_order):
+    """
+    Scattergl traces drawing every block of df as a filled rectangle on a
+    numeric swimlane axis (lane i at y=i, in lane_order). One polygon trace
+    per category (colored like px.timeline would) plus an invisible marker
+    trace at block centers carrying the hover data and block text.
+    """
+    lanes = pd.Series(range(len(lane_order)), index=pd.Index(lane_order))
+    palette = px.colors.qualitative.Plotly
+    traces = []
+    for i, cat in enumerate(category_order):
+        cat_df = df[df["Category"].isna()] if pd.isna(cat) else df[df["Category"] == cat]
+        if cat_df.empty:
+            continue
+        color = palette[i % len(palette)]
+        n = len(cat_df)
+        y = cat_df["Swimlane"].map(lanes).to_numpy(dtype=float)
+        x0 = _epoch_ms(cat_df["Start_dt"].to_numpy())
+        x1 = _epoch_ms(cat_df["End_dt"].to_numpy())
+        # Closed rectangle per block, blocks separated by NaN gaps
+        xs = np.full(n * 6, np.nan)
+        ys = np.full(n * 6, np.nan)
+        xs[0::6], xs[1::6], xs[2::6], xs[3::6], xs[4::6] = x0, x1, x1, x0, x0
+        bottom, top = y - BAR_HALF_HEIGHT, y + BAR_HALF_HEIGHT
+        ys[0::6], ys[1::6], ys[2::6], ys[3::6], ys[4::6] = bottom, bottom, top, top, bottom
+        traces.append(go.Scattergl(
+            x=xs, y=ys,
+            mode="lines",
+            fill="toself",
+            fillcolor=color,
+            line=dict(width=0, color=color),
+            hoverinfo="skip",
+            name=str(cat),
+            legendgroup=str(cat),
+            showlegend=False,
+        ))
+        customdata = np.column_stack([
+            cat_df["Start_dt"].dt.strftime("%Y-%m-%d %H:%M").to_numpy(),
+            cat_df["End_dt"].dt.strftime("%Y-%m-%d %H:%M").to_numpy(),
+            cat_df["Swimlane"].map(str).to_numpy(),
+        ] + [cat_df[col].map(str).to_numpy() for col in HOVER_COLUMNS] + [
+            cat_df["BlockText"].to_numpy(),
+        ])
+        hovertemplate = (
+            f"Category={cat}<br>Start_dt=%{{customdata[0]}}<br>End_dt=%{{customdata[1]}}<br>Swimlane=%{{customdata[2]}}<br>"
+            + "<br>".join(f"{col}=%{{customdata[{j + 3}]}}" for j, col in enumerate(HOVER_COLUMNS))
+            + f"<br><br>%{{customdata[{len(HOVER_COLUMNS) + 3}]}}<extra></extra>"
+        )
+        traces.append(go.Scattergl(
+            x=(x0 + x1) / 2, y=y,
+            mode="markers",
+            marker=dict(size=10, color=color, opacity=0),
+            customdata=customdata,
+            hovertemplate=hovertemplate,
+            name=str(cat),
+            legendgroup=str(cat),
+            showlegend=False,
+        ))
+    return traces
@@ -0,0 +1,165 @@
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+import numpy as np
+from data.store import is_event_store
+from parsing.dates import parse_datetimes
+
+# Production days start at 05:00
+DAY_START = timedelta(hours=5)
+
+# Number of live frames whose time index is kept per process (shared by all
+# sessions). Each entry holds a row-sorted copy of its frame plus 16 bytes per
+# row (start times and row order), about the size of the frame itself; it is
+# dropped as soon as the frame is garbage collected.
+TIME_INDEX_CACHE_SIZE = 4
+
+
+def view_window(view_mode, selected_date):
+    """
+    [start, end) of the Day/Week/Month window around selected_date, with
+    every boundary shifted to DAY_START.
+    """
+    if view_mode == "Day":
+        start = datetime.combine(selected_date, datetime.min.time()) + DAY_START
+        return start, start + timedelta(days=1)
+    if view_mode == "Week":
+        week_start = selected_date - timedelta(days=selected_date.weekday())
+        start = datetime.combine(week_start, datetime.min.time()) + DAY_START
+        return start, start + timedelta(days=7)
+    # Month
+    start = datetime(selected_date.year, selected_date.month, 1) + DAY_START
+    if selected_date.month == 12:
+        next_month = datetime(selected_date.year + 1, 1, 1)
+    else:
+        next_month = datetime(selected_date.year, selected_date.month + 1, 1)
+    return start, next_month + DAY_START
+
+
+def period_date(view_mode, selected_date):
+    """
+    First date of the Day/Week/Month period around selected_date. The charts
+    of any date in a period are the same as those of its first date.
+    """
+    if view_mode == "Day":
+        return selected_date
+    if view_mode == "Week":
+        return selected_date - timedelta(days=selected_date.weekday())
+    return selected_date.replace(day=1)
+
+
+def adjacent_periods(view_mode, selected_date):
+    """
+    (previous, next) period of the one around selected_date, as period_date.
+    """
+    start = period_date(view_mode, selected_date)
+    if view_mode == "Day":
+        return start - timedelta(days=1), start + timedelta(days=1)
+    if view_mode == "Week":
+        return start - timedelta(days=7), start + timedelta(days=7)
+    previous = (start - timedelta(days=1)).replace(day=1)
+    following = (start + timedelta(days=31)).replace(day=1)
+    return previous, following
+
+
+class TimeIndex:
+    """
+    Rows of a frame sorted by Start_dt, answering [start, end) window queries
+    with a binary search and a positional slice. Rows without a valid Start_dt
+    are left out. frame carries Start_dt/End_dt columns (parsed for raw
+    editor-format frames).
+    """
+
+    def __init__(self, df):
+        if is_event_store(df):
+            start_dt, end_dt = df["Start_dt"], df["End_dt"]
+        else:
+            start_dt, end_dt = parse_datetimes(df)
+        starts = start_dt.to_numpy(dtype="datetime64[ns]")
+        # NaT sorts last; stable so equal starts keep their table order
+        order = np.argsort(starts, kind="stable")[:int(start_dt.notna().sum())]
+        frame = df.iloc[order]
+        if not is_event_store(df):
+            frame = frame.assign(Start_dt=start_dt.iloc[order], End_dt=end_dt.iloc[order])
+        self.frame = frame
+        self.starts = starts[order]
+        self.positions = order
+
+    def __len__(self):
+        return len(self.starts)
+
+    def bounds(self, start, end):
+        lo, hi = np.searchsorted(self.starts, np.array([start, end], dtype="datetime64[ns]"))
+        return int(lo), int(hi)
+
+    def window(self, start, end, table_order=False):
+        """
+        Rows with start <= Start_dt < end, in Start_dt order (a slice, no copy
+        of the rows), or in their original table order with table_order.
+        """
+        lo, hi = self.bounds(start, end)
+        rows = self.frame.iloc[lo:hi]
+        if table_order:
+            rows = rows.iloc[np.argsort(self.positions[lo:hi], kind="stable")]
+        return rows
+
+
+_time_indexes = OrderedDict()
+_time_indexes_lock = Lock()
+# Entries of collected frames whose finalizer found the lock taken
+_dead_time_indexes = []
+
+
+def _purge_dead_time_indexes():
+    # Caller holds _time_indexes_lock
+    while _dead_time_indexes:
+        key, ref = _dead_time_indexes.pop()
+        entry = _time_indexes.get(key)
+        if entry is not None and entry[0] is ref:
+            del _time_indexes[key]
+
+
+def _drop_time_index(key, ref):
+    # Finalizer of an indexed frame: free its index right away instead of
+    # when newer frames push it out. It can run inside a locked section (on
+    # garbage collection), so it never waits for the lock.
+    _dead_time_indexes.append((key, ref))
+    if _time_indexes_lock.acquire(blocking=False):
+        try:
+            _purge_dead_time_indexes()
+        finally:
+            _time_indexes_lock.release()
+
+
+def time_index(df):
+    """
+    TimeIndex of df, built once per frame object and shared by the timeline
+    and the Pareto charts. Frames are treated as immutable once indexed; the
+    event store is replaced, not modified, on every edit, and the index of the
+    replaced store is freed with it.
+    """
+    key = id(df)
+    with _time_indexes_lock:
+        entry = _time_indexes.get(key)
+        if entry is not None and entry[0]() is df:
+            _time_indexes.move_to_end(key)
+            return entry[1]
+    index = TimeIndex(df)
+    ref = weakref.ref(df)
+    with _time_indexes_lock:
+        _purge_dead_time_indexes()
+        _time_indexes[key] = (ref, index)
+        _time_indexes.move_to_end(key)
+        while len(_time_indexes) > TIME_INDEX_CACHE_SIZE:
+            _time_indexes.popitem(last=False)
+    weakref.finalize(df, _drop_time_index, key, ref)
+    return index
+
+
+def window_rows(df, view_mode, selected_date, table_order=False):
+    """
+    (rows of df inside the view window, (start, end)).
+    """
+    start, end = view_window(view_mode, selected_date)
+    return time_index(df).window(start, end, table_order), (start, end)
@@ -0,0 +1,214 @@
+"""
+Headless batch reports of the timeline and Pareto charts.
+
+    python -m reports.batch [--start 01.03.2025] [--end 07.03.2025] [--views Day Week]
+                            [--workbook file.xlsx ...] [--out timeline_reports] [--format html]
+
+Renders one report per Day/Week/Month period touching [start, end] (the
+last 7 days by default) from the saved event table, or from the given
+workbooks. Periods are rendered in a process pool. HTML reports load
+plotly.js from a single plotly.min.js next to them instead of embedding
+it in every file. png/svg/pdf write one static image per chart and need
+a Plotly image exporter (kaleido).
+"""
+import argparse
+import html
+import importlib.util
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from plotly.offline import get_plotlyjs
+from data.io import load_event_store, load_workbooks
+from plots.pareto import PARETO_TOP_N, plot_dynamic_pareto_by_title, plot_dynamic_pareto_scrap_bgrade_by_title
+from plots.rollup import daily_rollup
+from plots.timeline import plot_timeline
+from utils.colors import CATEGORY_COLOR_MAP, assign_colors
+
+REPORT_DIR = "timeline_reports"
+PLOTLY_JS = "plotly.min.js"
+VIEW_MODES = ["Day", "Week", "Month"]
+IMAGE_FORMATS = ["png", "svg", "pdf"]
+
+# Event store, rollup and colors of the report run, set once per worker process
+_report = {}
+
+
+def parse_date(text):
+    """
+    DD.MM.YYYY (as in the dashboard) or YYYY-MM-DD.
+    """
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected DD.MM.YYYY or YYYY-MM-DD")
+
+
+def report_periods(view_mode, start, end):
+    """
+    Representative date of every view_mode period overlapping [start, end]:
+    each day, the Monday of each week or the 1st of each month.
+    """
+    if view_mode == "Day":
+        first, step = start, lambda d: d + timedelta(days=1)
+    elif view_mode == "Week":
+        first, step = start - timedelta(days=start.weekday()), lambda d: d + timedelta(days=7)
+    else:
+        first = start.replace(day=1)
+        step = lambda d: date(d.year + d.month // 12, d.month % 12 + 1, 1)
+    periods = []
+    d = first
+    while d <= end:
+        periods.append(d)
+        d = step(d)
+    return periods
+
+
+def report_name(view_mode, period):
+    if view_mode == "Day":
+        return f"day_{period:%Y-%m-%d}"
+    if view_mode == "Week":
+        year, week, _ = period.isocalendar()
+        return f"week_{year}-W{week:02d}"
+    return f"month_{period:%Y-%m}"
+
+
+def report_color_map(store):
+    # Same category colors as the dashboard
+    color_map = CATEGORY_COLOR_MAP.copy()
+    missing = [cat for cat in store["Category"].dropna().unique() if cat not in color_map]
+    if missing:
+        color_map.update(assign_colors(missing))
+    return color_map
+
+
+def _init_worker(store, out_dir, fmt):
+    _report.update(
+        store=store, rollup=daily_rollup(store), color_map=report_color_map(store), out_dir=out_dir, fmt=fmt
+    )
+
+
+def report_figures(view_mode, period):
+    """
+    (chart name, figure) of one report, built as in the dashboard.
+    """
+    store, rollup, color_map = _report["store"], _report["rollup"], _report["color_map"]
+    return [
+        ("timeline", plot_timeline(store, view_mode, period, color_map, renderer="auto")),
+        ("pareto_cost", plot_dynamic_pareto_by_title(
+            store, "Cost (€)", view_mode, period, color_map, rollup=rollup, top_n=PARETO_TOP_N
+        )),
+        ("pareto_scrap", plot_dynamic_pareto_scrap_bgrade_by_title(
+            store, view_mode, period, color_map, rollup=rollup, top_n=PARETO_TOP_N
+        )),
+    ]
+
+
+def _render_report(view_mode, period):
+    """
+    Write the report of one period; returns the written file names.
+    """
+    name = report_name(view_mode, period)
+    out_dir, fmt = _report["out_dir"], _report["fmt"]
+    figures = report_figures(view_mode, period)
+    if fmt in IMAGE_FORMATS:
+        files = []
+        for chart, fig in figures:
+            files.append(f"{name}_{chart}.{fmt}")
+            fig.write_image(os.path.join(out_dir, files[-1]), width=1800)
+        return files
+    divs = "\n".join(
+        fig.to_html(full_html=False, include_plotlyjs=False, config={"responsive": True}) for _, fig in figures
+    )
+    page = (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(name)}</title>\n<script src=\"{PLOTLY_JS}\"></script>\n</head>\n"
+        f"<body>\n{divs}\n</body>\n</html>\n"
+    )
+    with open(os.path.join(out_dir, name + ".html"), "w", encoding="utf-8") as f:
+        f.write(page)
+    return [name + ".html"]
+
+
+def write_index(out_dir, reports):
+    """
+    index.html linking every HTML report, grouped by view.
+    """
+    sections = []
+    for view_mode in VIEW_MODES:
+        links = [
+            f"<li><a href=\"{html.escape(files[0])}\">{html.escape(report_name(vm, period))}</a></li>"
+            for (vm, period), files in sorted(reports.items()) if vm == view_mode
+        ]
+        if links:
+            sections.append(f"<h2>{view_mode}</h2>\n<ul>\n" + "\n".join(links) + "\n</ul>")
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Timeline Reports</title>\n</head>\n"
+            "<body>\n<h1>Timeline Reports</h1>\n" + "\n".join(sections) + "\n</body>\n</html>\n"
+        )
+
+
+def build_reports(store, start, end, view_modes=("Day", "Week"), out_dir=REPORT_DIR, fmt="html", max_workers=None):
+    """
+    Render the reports of every view_modes period overlapping [start, end]
+    into out_dir. Returns {(view_mode, period): [file names]}.
+    """
+    if fmt in IMAGE_FORMATS and importlib.util.find_spec("kaleido") is None:
+        raise RuntimeError(f"{fmt} reports need the kaleido package; use --format html")
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "html":
+        # One copy of plotly.js for all reports in out_dir
+        js_path = os.path.join(out_dir, PLOTLY_JS)
+        if not os.path.exists(js_path):
+            with open(js_path, "w", encoding="utf-8") as f:
+                f.write(get_plotlyjs())
+    tasks = [(view_mode, period) for view_mode in view_modes for period in report_periods(view_mode, start, end)]
+    reports = {}
+    workers = min(len(tasks), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        _init_worker(store, out_dir, fmt)
+        for task in tasks:
+            reports[task] = _render_report(*task)
+            print(f"{len(reports)}/{len(tasks)} {', '.join(reports[task])}")
+    else:
+        # Each worker receives the store once and builds its own rollup
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(store, out_dir, fmt)
+        ) as pool:
+            futures = {pool.submit(_render_report, *task): task for task in tasks}
+            for future in as_completed(futures):
+                reports[futures[future]] = future.result()
+                print(f"{len(reports)}/{len(tasks)} {', '.join(reports[futures[future]])}")
+    if fmt == "html":
+        write_index(out_dir, reports)
+    return reports
+
+
+def main(argv=None):
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Render timeline and Pareto reports without Streamlit.")
+    parser.add_argument("--start", type=parse_date, default=yesterday - timedelta(days=6), help="first day (DD.MM.YYYY)")
+    parser.add_argument("--end", type=parse_date, default=yesterday, help="last day (DD.MM.YYYY)")
+    parser.add_argument("--views", nargs="+", choices=VIEW_MODES, default=["Day", "Week"])
+    parser.add_argument("--workbook", nargs="+", help="event workbooks to report on (default: the saved event table)")
+    parser.add_argument("--out", default=REPORT_DIR, help="output directory")
+    parser.add_argument("--format", choices=["html"] + IMAGE_FORMATS, default="html")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    if args.end < args.start:
+        parser.error("--end is before --start")
+
+    t0 = time.perf_counter()
+    store = load_workbooks(args.workbook, max_workers=args.workers) if args.workbook else load_event_store()
+    reports = build_reports(store, args.start, args.end, args.views, args.out, args.format, args.workers)
+    print(f"{len(reports)} reports for {len(store)} events written to {args.out} in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,19 +1,37 @@
+import base64
+import os
+
+# Process-wide cache of encoded images: path -> (mtime, base64 string)
+_encoded_images = {}
+
 def add_logo_to_fig(fig, logo_path, position="top right"):
     """
     Add image to Plotly figure layout.
     """
-    fig.add_layout_image(
-        dict(
-            source="data:image/png;base64," + encode_image_to_base64(logo_path),
-            xref="paper", yref="paper",
-            x=1, y=1,  # top right
-            sizex=0.18, sizey=0.18,  # adjust size as needed
-            xanchor="right", yanchor="top",
-            layer="above"
-        )
+    fig.add_layout_image(logo_image(logo_path))
+
+def logo_image(logo_path):
+    """
+    Layout image dict for the logo (top right, paper coordinates).
+    """
+    return dict(
+        source="data:image/png;base64," + encode_image_to_base64(logo_path),
+        xref="paper", yref="paper",
+        x=1, y=1,  # top right
+        sizex=0.18, sizey=0.18,  # adjust size as needed
+        xanchor="right", yanchor="top",
+        layer="above"
     )
 
 def encode_image_to_base64(image_path):
-    import base64
+    """
+    Base64 content of image_path, cached per process until the file's mtime changes.
+    """
+    mtime = os.path.getmtime(image_path)
+    cached = _encoded_images.get(image_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
     with open(image_path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+        encoded = base64.b64encode(f.read()).decode()
+    _encoded_images[image_path] = (mtime, encoded)
+    return encoded
@@ -0,0 +1,175 @@
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+
+# Stage timings are only taken when profiling is on; otherwise every hook
+# returns after a single flag check. The process default (TIMELINE_PROFILE=1
+# or set_profiling) can be overridden per thread by a ProfileRun, e.g. for
+# one Streamlit session's rerun.
+_default = os.environ.get("TIMELINE_PROFILE", "") not in ("", "0")
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_NULL_STAGE = nullcontext()
+
+
+def profiling_enabled():
+    """
+    Whether stages are timed on this thread.
+    """
+    return getattr(_local, "enabled", _default)
+
+
+def _enable_logging():
+    # Timings are logged at INFO level on this module's logger (to stderr
+    # unless the app configured logging itself)
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+
+def set_profiling(enabled):
+    """
+    Turn stage timing on or off by default for the whole process, e.g. in a
+    script. A ProfileRun started with an explicit enabled flag overrides it
+    on its thread.
+    """
+    global _default
+    _default = bool(enabled)
+    if _default:
+        _enable_logging()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _record(path, seconds):
+    run = getattr(_local, "run", None)
+    if run is not None:
+        run.stages.append((path, seconds))
+    logger.info("%s %.1f ms", path, seconds * 1000)
+
+
+class _Stage:
+    """
+    Timed block; nested stages are named parent/child.
+    """
+
+    __slots__ = ("path", "start", "last")
+
+    def __init__(self, name):
+        stack = _stack()
+        self.path = f"{stack[-1].path}/{name}" if stack else name
+
+    def __enter__(self):
+        self.start = self.last = time.perf_counter()
+        _stack().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        _record(self.path, time.perf_counter() - self.start)
+        return False
+
+
+def stage(name):
+    """
+    Context manager timing the enclosed block as stage name.
+    """
+    if not getattr(_local, "enabled", _default):
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def profiled(name=None):
+    """
+    Decorator timing every call of the function as a stage (named after the
+    function by default). lap() inside it splits the call into sub-stages.
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not getattr(_local, "enabled", _default):
+                return fn(*args, **kwargs)
+            with _Stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def lap(name):
+    """
+    End sub-stage name of the innermost running stage: the time since the
+    stage started or since its previous lap.
+    """
+    if not getattr(_local, "enabled", _default):
+        return
+    stack = _stack()
+    if not stack:
+        return
+    current = stack[-1]
+    now = time.perf_counter()
+    _record(f"{current.path}/{name}", now - current.last)
+    current.last = now
+
+
+class ProfileRun:
+    """
+    Stage timings collected on this thread between start() and stop(), e.g.
+    one Streamlit rerun. enabled turns profiling on or off on this thread
+    until stop() (the process default if None), so one session's setting
+    does not affect the others. Stays empty while profiling is off.
+    """
+
+    def __init__(self, label="", enabled=None):
+        self.label = label
+        self.enabled = enabled
+        self.started = None
+        self.seconds = None
+        self.stages = []
+
+    def start(self):
+        self.started = datetime.now()
+        self._t0 = time.perf_counter()
+        self._outer = getattr(_local, "enabled", None)
+        if self.enabled is not None:
+            _local.enabled = bool(self.enabled)
+        if profiling_enabled():
+            _enable_logging()
+            _local.run = self
+        return self
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._t0
+        if getattr(_local, "run", None) is self:
+            _local.run = None
+            logger.info("%s %.1f ms (%d stages)", self.label or "run", self.seconds * 1000, len(self.stages))
+        if self.enabled is not None:
+            if self._outer is None:
+                del _local.enabled
+            else:
+                _local.enabled = self._outer
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False